@@ -0,0 +1,141 @@
+# admission.py
+# Per-route concurrency limits for one web process. Each route gets a small
+# number of request slots and a short wait queue; once both are full the
+# request is turned away with 503 + Retry-After instead of tying up a worker
+# thread. The slot count adapts AIMD-style: it creeps up while requests finish
+# under the route's target latency and is cut back when they don't, so a slow
+# route (bcrypt in /login, a full /items dump) shrinks to what it can sustain
+# and the threads it would have held stay free for cheap routes.
+# No route may hold every thread of the worker: a route's limit stays below
+# WEB_THREADS, and a request only waits for a slot (which keeps its thread
+# busy) while at least one other thread is still free.
+import os
+import threading
+import time
+
+from flask import g, request, jsonify
+
+TARGET_MS = float(os.environ.get("ADMISSION_TARGET_MS", 500))
+THREADS = int(os.environ.get("WEB_THREADS", 4))   # same setting as gunicorn.conf.py
+MIN_LIMIT = 1
+MAX_LIMIT = min(float(os.environ.get("ADMISSION_MAX_LIMIT", THREADS - 1)), max(MIN_LIMIT, THREADS - 1))
+INITIAL_LIMIT = min(float(os.environ.get("ADMISSION_INITIAL_LIMIT", 4)), MAX_LIMIT)
+QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", 8))
+MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", 2))   # seconds
+BACKOFF = 0.9
+# routes whose normal latency is well above the default target
+ROUTE_TARGET_MS = {
+    "POST /login": 1000,
+    "POST /register": 1000,
+    "GET /items": 2000,
+    "POST /reconcile": 5000,
+    "POST /items/bulk": 5000,
+}
+
+_threads_lock = threading.Lock()
+_occupied = 0   # threads of this process in admitted or waiting requests
+
+def _occupy(to_wait=False):
+    """Counts one more busy thread; a waiter only if another thread stays free."""
+    global _occupied
+    with _threads_lock:
+        if to_wait and _occupied + 1 >= THREADS:
+            return False
+        _occupied += 1
+        return True
+
+def _vacate():
+    global _occupied
+    with _threads_lock:
+        _occupied -= 1
+
+class Limiter:
+    def __init__(self, target_ms):
+        self.target = target_ms / 1000
+        self.limit = INITIAL_LIMIT
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Takes a slot, waiting up to MAX_WAIT. False means reject."""
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                if self.waiting >= QUEUE_SIZE or not _occupy(to_wait=True):
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+                deadline = time.monotonic() + MAX_WAIT
+                try:
+                    while self.in_flight >= int(self.limit):
+                        left = deadline - time.monotonic()
+                        if left <= 0:
+                            self.rejected += 1
+                            _vacate()
+                            return False
+                        self._cond.wait(left)
+                finally:
+                    self.waiting -= 1
+            else:
+                _occupy()
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def release(self, elapsed):
+        with self._cond:
+            self.in_flight -= 1
+            _vacate()
+            if elapsed > self.target:
+                self.limit = max(MIN_LIMIT, self.limit * BACKOFF)
+            else:
+                # about +1 per window of `limit` fast requests
+                self.limit = min(MAX_LIMIT, self.limit + 1 / self.limit)
+            self._cond.notify()
+
+    def stats(self):
+        return {
+            "limit": round(self.limit, 2), "in_flight": self.in_flight,
+            "waiting": self.waiting, "admitted": self.admitted, "rejected": self.rejected,
+        }
+
+_lock = threading.Lock()
+_limiters = {}
+
+def limiter_for(key):
+    with _lock:
+        lim = _limiters.get(key)
+        if lim is None:
+            lim = _limiters[key] = Limiter(ROUTE_TARGET_MS.get(key, TARGET_MS))
+        return lim
+
+def stats():
+    with _lock:
+        return {key: lim.stats() for key, lim in sorted(_limiters.items())}
+
+def occupancy():
+    with _threads_lock:
+        return {"threads": THREADS, "occupied": _occupied}
+
+def init_app(app):
+    @app.before_request
+    def admit():
+        if request.url_rule is None or request.method == "OPTIONS":
+            return None
+        lim = limiter_for(f"{request.method} {request.url_rule.rule}")
+        if not lim.acquire():
+            resp = jsonify(error="Server busy, retry shortly")
+            resp.status_code = 503
+            resp.headers["Retry-After"] = str(max(1, round(lim.target * 2)))
+            return resp
+        g.admission = (lim, time.monotonic())
+        return None
+
+    @app.teardown_request
+    def leave(exc):
+        entry = g.pop("admission", None)
+        if entry:
+            lim, start = entry
+            lim.release(time.monotonic() - start)
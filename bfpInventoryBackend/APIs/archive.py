@@ -0,0 +1,91 @@
+# archive.py
+# Moves retired devices (condemned, disposed, ...) out of the hot inventory
+# table into inventory_archive so everyday reads only carry the active fleet.
+# Archived items leave dedupe_blocks and get an "archive" history entry.
+#   python archive.py [--days N] [--batch N]
+import argparse
+import os
+import sqlite3
+from datetime import datetime as dt, timedelta
+
+import dedupe
+import history
+
+ARCHIVE_STATUSES = tuple(
+    s.strip() for s in os.environ.get("ARCHIVE_STATUSES", "Condemned,Disposed,Unserviceable").split(",")
+    if s.strip()
+)
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 365))
+BATCH_SIZE = 500
+
+def init_archive_table(cur):
+    """
+    Creates inventory_archive and adds any column inventory has that the
+    archive is missing, so the two tables never drift apart.
+    """
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS inventory_archive (
+        id TEXT PRIMARY KEY,
+        archived_at TEXT NOT NULL
+      )
+    """)
+    have = {r["name"] for r in cur.execute("PRAGMA table_info(inventory_archive)")}
+    for r in cur.execute("PRAGMA table_info(inventory)").fetchall():
+        if r["name"] not in have:
+            cur.execute(f"ALTER TABLE inventory_archive ADD COLUMN {r['name']} {r['type']}")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_archive_mac_int ON inventory_archive(mac_int)")
+
+def archive_retired(conn, statuses=ARCHIVE_STATUSES, older_than_days=ARCHIVE_AFTER_DAYS,
+                    batch_size=BATCH_SIZE):
+    """
+    Moves items whose status is one of statuses (in any case) and whose
+    timestamp is older than older_than_days into inventory_archive,
+    committing after each batch so writers are never blocked for long.
+    Returns the number of rows moved.
+    """
+    cur = conn.cursor()
+    init_archive_table(cur)
+    cur.execute(
+      f"SELECT id FROM lookup_values WHERE field='status' AND lower(value) IN ({','.join('?' * len(statuses))})",
+      [s.lower() for s in statuses]
+    )
+    status_ids = [r["id"] for r in cur.fetchall()]
+    if not status_ids:
+        return 0
+    cols = ",".join(r["name"] for r in cur.execute("PRAGMA table_info(inventory)").fetchall())
+    cutoff = (dt.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+    now = dt.now().strftime("%Y-%m-%d %H:%M:%S")
+    moved = 0
+    while True:
+        cur.execute(f"""
+          SELECT id FROM inventory
+          WHERE status_id IN ({','.join('?' * len(status_ids))}) AND timestamp < ?
+          LIMIT ?
+        """, (*status_ids, cutoff, batch_size))
+        ids = [r["id"] for r in cur.fetchall()]
+        if not ids:
+            return moved
+        marks = ",".join("?" * len(ids))
+        cur.execute(f"""
+          INSERT OR REPLACE INTO inventory_archive ({cols}, archived_at)
+          SELECT {cols}, ? FROM inventory WHERE id IN ({marks})
+        """, (now, *ids))
+        cur.execute(f"DELETE FROM inventory WHERE id IN ({marks})", ids)
+        for iid in ids:
+            dedupe.unindex_item(cur, iid)
+        history.record(cur, [(iid, now, "archive", {"archived_at": [None, now]}) for iid in ids])
+        conn.commit()
+        moved += len(ids)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive retired inventory items.")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="only archive items unchanged for this many days")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect("bfp_inventory.db")
+    conn.row_factory = sqlite3.Row
+    n = archive_retired(conn, older_than_days=args.days, batch_size=args.batch)
+    conn.close()
+    print(f"✅ Archived {n} retired items.")
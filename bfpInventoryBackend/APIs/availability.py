@@ -0,0 +1,85 @@
+# availability.py
+# Username/email availability without hashing a password or hitting the
+# UNIQUE index first. Every worker keeps a Bloom filter of taken usernames
+# and emails: a miss means "free" for certain, a hit is confirmed against
+# users.db. Like lookups.py, the filter only needs to pick up users added by
+# other workers since the last sync (users.id only grows).
+import hashlib
+import math
+import os
+import threading
+
+CAPACITY = int(os.environ.get("AVAILABILITY_FILTER_CAPACITY", 100000))
+FALSE_POSITIVE_RATE = 0.01
+FIELDS = ("username", "email")
+
+class BloomFilter:
+    def __init__(self, capacity, fp_rate=FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+_lock = threading.Lock()
+_filter = BloomFilter(CAPACITY)
+_max_id = 0
+
+def _key(field, value):
+    return f"{field}:{value}"
+
+def _remember(rows):
+    global _filter, _max_id
+    rows = list(rows)
+    if _filter.count + len(rows) * len(FIELDS) > _filter.capacity:
+        # past capacity the false-positive rate climbs; start over bigger
+        _filter, _max_id = BloomFilter(_filter.capacity * 2), 0
+        return False
+    for r in rows:
+        for f in FIELDS:
+            _filter.add(_key(f, r[f]))
+        _max_id = max(_max_id, r["id"])
+    return True
+
+def sync(cur):
+    """Adds users created since the last sync (by any worker) to the filter."""
+    cur.execute("SELECT MAX(id) AS max_id FROM users")
+    latest = cur.fetchone()["max_id"] or 0
+    if latest > _max_id:
+        with _lock:
+            while True:
+                cur.execute("SELECT id, username, email FROM users WHERE id>?", (_max_id,))
+                if _remember(cur.fetchall()):
+                    break
+
+def add(username, email):
+    """
+    Marks a user this worker just inserted as taken. _max_id is left alone so
+    the next sync still picks up rows other workers inserted before this one.
+    """
+    with _lock:
+        for f, v in zip(FIELDS, (username, email)):
+            _filter.add(_key(f, v))
+
+def taken(cur, field, value):
+    """True if some user already has this username/email."""
+    sync(cur)
+    if _key(field, value) not in _filter:
+        return False
+    cur.execute(f"SELECT 1 FROM users WHERE {field}=?", (value,))
+    return cur.fetchone() is not None
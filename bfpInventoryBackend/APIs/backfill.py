@@ -0,0 +1,53 @@
+# backfill.py
+# Recomputes the derived inventory columns from their free-form source columns.
+# Runs automatically when a column is first added; run it by hand after the
+# parsers in normalize.py change:
+#   python backfill.py
+import sqlite3
+
+from normalize import normalize_mac, parse_ram_mb, parse_storage
+
+BATCH_SIZE = 500
+
+def backfill_mac_int(cur):
+    """
+    Fills mac_int for existing rows. When two rows share a MAC the oldest one
+    keeps it and the rest stay NULL so the unique index can still be built.
+    """
+    cur.execute("SELECT id, mac_address FROM inventory ORDER BY timestamp")
+    seen, updates = {}, []
+    for r in cur.fetchall():
+        mac_int = normalize_mac(r["mac_address"])
+        if mac_int is None:
+            continue
+        if mac_int in seen:
+            print(f"⚠️ duplicate MAC {r['mac_address']} on {r['id']} (kept on {seen[mac_int]})")
+            continue
+        seen[mac_int] = r["id"]
+        updates.append((mac_int, r["id"]))
+    cur.executemany("UPDATE inventory SET mac_int=? WHERE id=?", updates)
+
+def backfill_specs(cur):
+    """Re-parses ram/internal_memory into ram_mb, storage_gb and storage_type."""
+    last_id, total = "", 0
+    while True:
+        cur.execute(
+          "SELECT id, ram, internal_memory FROM inventory WHERE id>? ORDER BY id LIMIT ?",
+          (last_id, BATCH_SIZE)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return total
+        cur.executemany(
+          "UPDATE inventory SET ram_mb=?, storage_gb=?, storage_type=? WHERE id=?",
+          [(parse_ram_mb(r["ram"]), *parse_storage(r["internal_memory"]), r["id"]) for r in rows]
+        )
+        last_id, total = rows[-1]["id"], total + len(rows)
+
+if __name__ == "__main__":
+    conn = sqlite3.connect("bfp_inventory.db")
+    conn.row_factory = sqlite3.Row
+    n = backfill_specs(conn.cursor())
+    conn.commit()
+    conn.close()
+    print(f"✅ Re-parsed hardware specs for {n} items.")
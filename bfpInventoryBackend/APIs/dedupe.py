@@ -0,0 +1,194 @@
+# dedupe.py
+# Finds likely duplicate devices (same machine entered twice, e.g. pc_name
+# "BFP-ADMIN-01" vs "bfp admin 01", or a MAC with one mistyped digit).
+# Items are only compared when they share a blocking key:
+#   n:<first letters of the normalized name, minus the shared "bfp" stem,
+#     followed by its number without zero padding>
+#   m:<NIC half of the MAC>, mh:/ml:<vendor prefix + high/low half of the NIC>
+#     (a typo anywhere in the MAC leaves at least one of the three intact)
+#   b:<brand_model_id>:<last characters of the normalized name>
+# so the full report is about one pass plus a bounded number of comparisons
+# per item instead of every pair. Keys live in dedupe_blocks, kept current by
+# the item routes, so an insert can look up its candidates by index; after
+# changing how keys are built, recompute them with --rebuild. The full report
+# runs on the job worker ("duplicates" kind) or from here:
+#   python dedupe.py [--threshold 0.85] [--out report.json] [--rebuild]
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from difflib import SequenceMatcher
+
+from normalize import normalize_name
+
+THRESHOLD = float(os.environ.get("DEDUPE_THRESHOLD", 0.85))
+# every pc_name starts with these, so they say nothing about which machine it is
+NAME_STEMS = tuple(s for s in os.environ.get("DEDUPE_NAME_STEMS", "bfp").lower().split(",") if s)
+NAME_PREFIX = 5
+NAME_SUFFIX = 3
+MAX_BLOCK = 100      # bigger blocks (a name prefix everyone shares, say) say too little to be worth comparing
+MAX_CANDIDATES = 200
+SPEC_COLUMNS = ("brand_model_id", "processor_id", "motherboard", "ram")
+ROW_SQL = f"SELECT id, office_id, pc_name, mac_int, {', '.join(SPEC_COLUMNS)} FROM inventory"
+
+def init_dedupe_table(cur):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='dedupe_blocks'")
+    existed = cur.fetchone() is not None
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS dedupe_blocks (
+        key TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        PRIMARY KEY (key, item_id)
+      ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_dedupe_blocks_item ON dedupe_blocks(item_id)")
+    if not existed:
+        rebuild(cur)
+
+def _name_key(name):
+    """"bfpadmin001" and "bfpadmin1" both become "admin1"."""
+    for stem in NAME_STEMS:
+        if name.startswith(stem) and len(name) > len(stem):
+            name = name[len(stem):]
+            break
+    letters = "".join(filter(str.isalpha, name))
+    digits = "".join(filter(str.isdigit, name)).lstrip("0")
+    return letters[:NAME_PREFIX] + digits
+
+def blocking_keys(row):
+    keys = []
+    name = normalize_name(row["pc_name"])
+    if len(name) >= 3:
+        keys.append("n:" + _name_key(name))
+        if row["brand_model_id"] is not None:
+            keys.append(f"b:{row['brand_model_id']}:{name[-NAME_SUFFIX:]}")
+    if row["mac_int"] is not None:
+        mac = f"{row['mac_int']:012x}"
+        oui, nic = mac[:6], mac[6:]
+        keys.extend((f"m:{nic}", f"mh:{oui}{nic[:3]}", f"ml:{oui}{nic[3:]}"))
+    return keys
+
+def _name_similarity(a, b):
+    sim = SequenceMatcher(None, a, b).ratio()
+    # "admin01" vs "admin02" are two machines, not a typo
+    digits_a, digits_b = ("".join(filter(str.isdigit, n)).lstrip("0") for n in (a, b))
+    if digits_a and digits_b and digits_a != digits_b:
+        sim *= 0.5
+    return sim
+
+def score(a, b):
+    """0..1 similarity of two inventory rows, from name, MAC and specs."""
+    parts = []   # (weight, similarity) for whatever both rows have
+    na, nb = normalize_name(a["pc_name"]), normalize_name(b["pc_name"])
+    if na and nb:
+        parts.append((0.5, _name_similarity(na, nb)))
+    if a["mac_int"] is not None and b["mac_int"] is not None:
+        ma, mb = f"{a['mac_int']:012x}", f"{b['mac_int']:012x}"
+        parts.append((0.3, sum(x == y for x, y in zip(ma, mb)) / 12))
+    specs = [(a[c], b[c]) for c in SPEC_COLUMNS if a[c] is not None and b[c] is not None]
+    if specs:
+        parts.append((0.2, sum(x == y for x, y in specs) / len(specs)))
+    if not parts:
+        return 0.0
+    return sum(w * s for w, s in parts) / sum(w for w, _ in parts)
+
+def index_item(cur, item_id):
+    """Replaces the item's blocking keys; call after it is inserted or updated."""
+    unindex_item(cur, item_id)
+    cur.execute(ROW_SQL + " WHERE id=?", (item_id,))
+    row = cur.fetchone()
+    if row:
+        cur.executemany(
+          "INSERT OR IGNORE INTO dedupe_blocks (key, item_id) VALUES (?,?)",
+          [(k, item_id) for k in blocking_keys(row)]
+        )
+
+def unindex_item(cur, item_id):
+    cur.execute("DELETE FROM dedupe_blocks WHERE item_id=?", (item_id,))
+
+def candidates(cur, item_id, threshold=THRESHOLD):
+    """Items scoring at least threshold against item_id, best first."""
+    cur.execute(ROW_SQL + " WHERE id=?", (item_id,))
+    row = cur.fetchone()
+    if not row:
+        return []
+    keys = blocking_keys(row)
+    if not keys:
+        return []
+    cur.execute(f"""
+      {ROW_SQL} WHERE id IN (
+        SELECT item_id FROM dedupe_blocks
+        WHERE key IN ({','.join('?' * len(keys))}) AND item_id<>?
+        LIMIT ?
+      )
+    """, (*keys, item_id, MAX_CANDIDATES))
+    found = [(score(row, other), other) for other in cur.fetchall()]
+    return [
+        {"id": other["id"], "office_id": other["office_id"], "pc_name": other["pc_name"], "score": round(s, 3)}
+        for s, other in sorted(found, key=lambda f: -f[0]) if s >= threshold
+    ]
+
+def rebuild(cur):
+    """Recomputes dedupe_blocks for the whole inventory in one pass."""
+    cur.execute("DELETE FROM dedupe_blocks")
+    cur.execute(ROW_SQL)
+    pairs = [(k, r["id"]) for r in cur.fetchall() for k in blocking_keys(r)]
+    cur.executemany("INSERT OR IGNORE INTO dedupe_blocks (key, item_id) VALUES (?,?)", pairs)
+
+def report(cur, threshold=THRESHOLD, max_block=MAX_BLOCK):
+    """
+    Likely duplicate pairs over the whole inventory, best first. Rows are
+    grouped by blocking key in memory and only compared within a block;
+    blocks over max_block are skipped and counted in skipped_blocks.
+    """
+    cur.execute(ROW_SQL)
+    rows, blocks = {}, {}
+    for r in cur:
+        rows[r["id"]] = r
+        for k in blocking_keys(r):
+            blocks.setdefault(k, []).append(r["id"])
+    seen, pairs, skipped = set(), [], {}
+    for key, ids in blocks.items():
+        if len(ids) > max_block:
+            skipped[key] = len(ids)
+            continue
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                s = score(rows[a], rows[b])
+                if s >= threshold:
+                    pairs.append({
+                        "a": {"id": a, "pc_name": rows[a]["pc_name"]},
+                        "b": {"id": b, "pc_name": rows[b]["pc_name"]},
+                        "score": round(s, 3),
+                    })
+    pairs.sort(key=lambda p: -p["score"])
+    return {"items": len(rows), "comparisons": len(seen), "skipped_blocks": skipped, "pairs": pairs}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report likely duplicate inventory items.")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--rebuild", action="store_true", help="recompute dedupe_blocks first")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect("bfp_inventory.db")
+    conn.row_factory = sqlite3.Row
+    if args.rebuild:
+        rebuild(conn.cursor())
+        conn.commit()
+        print("✅ dedupe_blocks rebuilt", file=sys.stderr)
+    result = report(conn.cursor(), args.threshold)
+    conn.close()
+    if result["skipped_blocks"]:
+        print(f"⚠️ {len(result['skipped_blocks'])} blocks over {MAX_BLOCK} items were not compared", file=sys.stderr)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ {len(result['pairs'])} likely duplicates in {result['items']} items, written to {args.out}")
+    else:
+        print(json.dumps(result, indent=2))
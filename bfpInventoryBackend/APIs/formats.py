@@ -0,0 +1,72 @@
+# formats.py
+# Response encodings picked from the Accept header. Browsers (and anything
+# sending */*) keep getting JSON; bulk clients can ask for
+#   application/msgpack                    same shape as JSON, binary
+#   application/vnd.bfp.columnar+json      {"columns": [...], "rows": [[...], ...]}
+#   application/vnd.bfp.columnar+msgpack   the columnar shape in MessagePack
+# Row encoders take column names plus an iterable of sequences (cursor rows),
+# so keys are written once per row at most and no per-row dict is built.
+# msgpack is optional; without it only the JSON types are offered.
+from flask import current_app, request, Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR_JSON = "application/vnd.bfp.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.bfp.columnar+msgpack"
+
+def offered():
+    types = [JSON, COLUMNAR_JSON]
+    if msgpack:
+        types += [MSGPACK, COLUMNAR_MSGPACK]
+    return types
+
+def negotiate():
+    # JSON is listed first, so it wins ties such as */*
+    return request.accept_mimetypes.best_match(offered(), default=JSON)
+
+def _msgpack_rows(columns, rows):
+    packer = msgpack.Packer()
+    keys = [packer.pack(c) for c in columns]
+    rows = list(rows)
+    out = [packer.pack_array_header(len(rows))]
+    for r in rows:
+        out.append(packer.pack_map_header(len(keys)))
+        for k, v in zip(keys, r):
+            out.append(k)
+            out.append(packer.pack(v))
+    return b"".join(out)
+
+def _response(body, status, mimetype):
+    resp = Response(body, status, mimetype=mimetype)
+    # one URL answers in several formats, so caches have to key on Accept
+    resp.vary.add("Accept")
+    return resp
+
+def _json(obj):
+    return current_app.json.dumps(obj)
+
+def rows_response(columns, rows, status=200):
+    """A list of records in the negotiated format."""
+    mimetype = negotiate()
+    if mimetype == COLUMNAR_JSON:
+        return _response(_json({"columns": list(columns), "rows": [list(r) for r in rows]}), status, mimetype)
+    if mimetype == COLUMNAR_MSGPACK:
+        body = msgpack.packb({"columns": list(columns), "rows": [list(r) for r in rows]})
+        return _response(body, status, mimetype)
+    if mimetype == MSGPACK:
+        return _response(_msgpack_rows(columns, rows), status, mimetype)
+    return _response(_json([dict(zip(columns, r)) for r in rows]), status, JSON)
+
+def record_response(record, status=200):
+    """One record (a dict) in the negotiated format."""
+    mimetype = negotiate()
+    if mimetype in (COLUMNAR_JSON, COLUMNAR_MSGPACK):
+        return rows_response(list(record), [list(record.values())], status)
+    if mimetype == MSGPACK:
+        return _response(msgpack.packb(record), status, mimetype)
+    return _response(_json(record), status, JSON)
@@ -0,0 +1,59 @@
+# gunicorn.conf.py
+# Server settings for `gunicorn main:app` (gunicorn reads this file from the
+# working directory on its own). Everything can be overridden from the env:
+#   WEB_CONCURRENCY        worker processes (default: one per core, at least 2)
+#   WEB_THREADS            threads per worker for gthread (default 4)
+#   GUNICORN_WORKER_CLASS  gthread (default) or sync
+#   GUNICORN_MAX_REQUESTS  recycle a worker after this many requests (default 1000)
+#
+# Reloads:
+#   kill -HUP <master>     new workers with new settings; old ones finish
+#                          their requests first. The app stays preloaded, so
+#                          for new code use the USR2 dance:
+#   kill -USR2 <master>    start a second master with the new code, then
+#   kill -WINCH <old>      drain the old workers and
+#   kill -QUIT <old>       retire the old master; no request is dropped.
+import os
+
+def _cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", max(2, _cores())))
+# gthread: several requests per process, so one slow query or bcrypt call
+# no longer holds the whole worker; admission.py limits per route within it
+threads = int(os.environ.get("WEB_THREADS", 4))
+
+# load main.py once in the master: migrations run once, and workers fork
+# with the warmed lookup and username caches already in memory
+preload_app = True
+
+# recycle workers to cap memory creep; jitter keeps them from all restarting at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+# above the longest per-route statement budget in timeouts.py (/reconcile)
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 130))
+graceful_timeout = 30
+keepalive = 5
+
+def when_ready(server):
+    """Warms in-memory caches in the master so every worker inherits them."""
+    import lookups
+    import main
+    conn = main.get_inventory_conn()
+    try:
+        lookups.sync(conn.cursor())
+    finally:
+        # connections must not cross fork
+        conn.close()
+
+def post_fork(server, worker):
+    """Starts the readiness probes as soon as the worker exists."""
+    import main
+    main.prober.ensure_started()
@@ -0,0 +1,72 @@
+# health.py
+# /healthz and /readyz for the load balancer. /healthz only proves the
+# process answers. /readyz reports dependency probes that a background
+# thread runs every HEALTH_INTERVAL seconds, so the request itself never
+# touches the database. Results older than a few intervals (a probe stuck
+# on a hung connection) count as failing, and a worker whose first round has
+# not finished yet reports "starting" (not ready) rather than probing inline.
+# gunicorn's post_fork starts the thread so that first round begins early.
+import os
+import threading
+import time
+
+from flask import jsonify
+
+HEALTH_INTERVAL = float(os.environ.get("HEALTH_INTERVAL", 10))
+STALE_INTERVALS = 3
+
+class Prober:
+    def __init__(self, probes, interval=HEALTH_INTERVAL):
+        self.probes = probes        # name -> function that raises on failure
+        self.interval = interval
+        self._results = {}
+        self._checked_at = 0.0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def run_once(self):
+        results = {}
+        for name, probe in self.probes.items():
+            start = time.monotonic()
+            try:
+                probe()
+                results[name] = {"ok": True}
+            except Exception as e:
+                results[name] = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            results[name]["ms"] = round((time.monotonic() - start) * 1000, 1)
+        with self._lock:
+            self._results, self._checked_at = results, time.monotonic()
+
+    def _loop(self):
+        while True:
+            self.run_once()
+            time.sleep(self.interval)
+
+    def ensure_started(self):
+        # threads do not survive gunicorn's fork, so each worker starts its own
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._loop, daemon=True, name="health-probes").start()
+
+    def report(self):
+        self.ensure_started()
+        with self._lock:
+            results, checked_at = dict(self._results), self._checked_at
+        if not checked_at:
+            return False, {"ready": False, "starting": True, "checks": {}}
+        age = time.monotonic() - checked_at
+        stale = age > STALE_INTERVALS * self.interval
+        ready = not stale and all(r["ok"] for r in results.values())
+        return ready, {"ready": ready, "checked_seconds_ago": round(age, 1), "stale": stale, "checks": results}
+
+def init_app(app, prober):
+    @app.route("/healthz", methods=["GET"])
+    def healthz():
+        return jsonify(status="ok"),200
+
+    @app.route("/readyz", methods=["GET"])
+    def readyz():
+        ready, body = prober.report()
+        return jsonify(body),(200 if ready else 503)
@@ -0,0 +1,88 @@
+# history.py
+# Append-only change log for inventory. Each mutation writes one row holding
+# only the columns that changed, as {"column": [old, new]}, inside the same
+# transaction as the mutation itself.
+import json
+
+HISTORY_FIELDS = (
+    "office_id", "computer_device", "pc_name", "brand_model", "processor", "motherboard",
+    "ram", "graphics_processing", "internal_memory", "mac_address", "operating_system",
+    "microsoft_office", "antivirus_software", "status",
+)
+
+def init_history_table(cur):
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS item_history (
+        id INTEGER PRIMARY KEY,
+        item_id TEXT NOT NULL,
+        changed_at TEXT NOT NULL,
+        action TEXT NOT NULL,
+        changes TEXT NOT NULL
+      )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_history_item ON item_history(item_id, changed_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_history_changed_at ON item_history(changed_at)")
+
+def _text(v):
+    return None if v is None else str(v)
+
+def diff(old, new):
+    """
+    Returns {column: [old, new]} for the history columns that differ.
+    old is None for a create, new is None for a delete.
+    """
+    old, new = old or {}, new or {}
+    out = {}
+    for f in HISTORY_FIELDS:
+        before, after = _text(old.get(f)), _text(new.get(f))
+        if before != after:
+            out[f] = [before, after]
+    return out
+
+def record(cur, entries):
+    """
+    Appends history rows for [(item_id, changed_at, action, changes), ...].
+    Entries with no changes are skipped. Does not commit.
+    """
+    rows = [
+        (iid, ts, action, json.dumps(changes, separators=(",", ":")))
+        for iid, ts, action, changes in entries if changes
+    ]
+    cur.executemany(
+      "INSERT INTO item_history (item_id, changed_at, action, changes) VALUES (?,?,?,?)",
+      rows
+    )
+
+def _range(clauses, params, since, until):
+    if since:
+        clauses.append("changed_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("changed_at < ?")
+        params.append(until)
+
+def _rows(cur):
+    return [dict(r, changes=json.loads(r["changes"])) for r in cur.fetchall()]
+
+def item_history(cur, item_id, since=None, until=None):
+    """All changes to one item, oldest first, optionally within [since, until)."""
+    clauses, params = ["item_id = ?"], [item_id]
+    _range(clauses, params, since, until)
+    cur.execute(f"""
+      SELECT changed_at, action, changes FROM item_history
+      WHERE {" AND ".join(clauses)}
+      ORDER BY changed_at, id
+    """, params)
+    return _rows(cur)
+
+def changes_between(cur, since=None, until=None, limit=500):
+    """Changes across all items within [since, until), newest first."""
+    clauses, params = ["1=1"], []
+    _range(clauses, params, since, until)
+    cur.execute(f"""
+      SELECT item_id, changed_at, action, changes FROM item_history
+      WHERE {" AND ".join(clauses)}
+      ORDER BY changed_at DESC, id DESC
+      LIMIT ?
+    """, params + [limit])
+    return _rows(cur)
@@ -0,0 +1,115 @@
+# idempotency.py
+# Idempotency-Key support for mutating routes. The first request with a key
+# stores its response; a retry with the same key gets that response back
+# without the handler running again. Keys belong to the user who sent them,
+# and routes whose access depends on the request (an item's office) pass an
+# authorize check that runs before anything is replayed. Keys expire after
+# IDEMPOTENCY_TTL_HOURS and are purged in batches by worker.py.
+import functools
+import hashlib
+import os
+import sqlite3
+import time
+
+from flask import g, request, jsonify, make_response
+
+DB_PATH = "bfp_inventory.db"
+TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_HOURS", 24)) * 3600
+PURGE_BATCH = 500
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_idempotency_table(cur):
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key TEXT PRIMARY KEY,
+        request_hash TEXT NOT NULL,
+        status INTEGER,
+        body BLOB,
+        mimetype TEXT,
+        expires_at REAL NOT NULL
+      )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys(expires_at)")
+
+def _request_hash():
+    h = hashlib.sha256(f"{g.get('user_id')}\n{request.method} {request.path}\n".encode())
+    h.update(request.get_data())
+    return h.hexdigest()
+
+def idempotent(view=None, *, authorize=None):
+    """
+    Honours an Idempotency-Key header. The key is claimed (status NULL)
+    before the handler runs, so a concurrent retry gets 409 instead of a
+    second execution. 5xx responses and exceptions release the key.
+    authorize(*args, **kwargs) returns an error response, or None to go on.
+    """
+    if view is None:
+        return functools.partial(idempotent, authorize=authorize)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(*args, **kwargs)
+        if authorize is not None:
+            denied = authorize(*args, **kwargs)
+            if denied is not None:
+                return denied
+        key = f"{g.get('user_id')}:{key}"
+        req_hash = _request_hash()
+        conn = _connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM idempotency_keys WHERE key=? AND expires_at<?", (key, time.time()))
+            cur.execute(
+              "INSERT OR IGNORE INTO idempotency_keys (key, request_hash, expires_at) VALUES (?,?,?)",
+              (key, req_hash, time.time() + TTL_SECONDS)
+            )
+            conn.commit()
+            if not cur.rowcount:
+                row = cur.execute("SELECT * FROM idempotency_keys WHERE key=?", (key,)).fetchone()
+                if row["request_hash"] != req_hash:
+                    return jsonify(error="Idempotency-Key was already used for a different request"),422
+                if row["status"] is None:
+                    return jsonify(error="A request with this Idempotency-Key is still in progress"),409
+                resp = make_response(row["body"], row["status"])
+                resp.mimetype = row["mimetype"]
+                resp.headers["Idempotent-Replayed"] = "true"
+                return resp
+
+            try:
+                resp = make_response(view(*args, **kwargs))
+            except Exception:
+                cur.execute("DELETE FROM idempotency_keys WHERE key=?", (key,))
+                conn.commit()
+                raise
+            if resp.status_code >= 500:
+                cur.execute("DELETE FROM idempotency_keys WHERE key=?", (key,))
+            else:
+                cur.execute(
+                  "UPDATE idempotency_keys SET status=?, body=?, mimetype=? WHERE key=?",
+                  (resp.status_code, resp.get_data(), resp.mimetype, key)
+                )
+            conn.commit()
+            return resp
+        finally:
+            conn.close()
+    return wrapper
+
+def purge_expired(conn, batch_size=PURGE_BATCH):
+    """Deletes expired keys a batch at a time. Returns the number removed."""
+    removed = 0
+    while True:
+        n = conn.execute("""
+          DELETE FROM idempotency_keys WHERE rowid IN (
+            SELECT rowid FROM idempotency_keys WHERE expires_at<? LIMIT ?
+          )
+        """, (time.time(), batch_size)).rowcount
+        conn.commit()
+        removed += n
+        if n < batch_size:
+            return removed
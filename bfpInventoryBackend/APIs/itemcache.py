@@ -0,0 +1,81 @@
+# itemcache.py
+# The unfiltered GET /items response, built once per data version. Triggers
+# bump inventory_version on every write to inventory or offices, whichever
+# process makes it, so each web worker only has to read one integer to know
+# whether its cached bytes are still current. Bodies are kept both plain and
+# gzipped, per negotiated format, and carry a strong ETag.
+import gzip
+import threading
+
+from flask import request, make_response
+
+import formats
+
+GZIP_LEVEL = 6
+
+def init_version_table(cur):
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS inventory_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+      )
+    """)
+    cur.execute("INSERT OR IGNORE INTO inventory_version (id, version) VALUES (1, 1)")
+    for table in ("inventory", "offices"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+              CREATE TRIGGER IF NOT EXISTS bump_version_{table}_{event.lower()}
+              AFTER {event} ON {table}
+              BEGIN
+                UPDATE inventory_version SET version = version + 1 WHERE id = 1;
+              END
+            """)
+
+def current_version(cur):
+    cur.execute("SELECT version FROM inventory_version WHERE id=1")
+    return cur.fetchone()[0]
+
+class Entry:
+    def __init__(self, version, etag, mimetype, body):
+        self.version = version
+        self.etag = etag
+        self.mimetype = mimetype
+        self.body = body
+        self.gzipped = gzip.compress(body, GZIP_LEVEL)
+
+_lock = threading.Lock()
+_entries = {}   # negotiated mimetype -> Entry for the newest version seen
+
+def _entry(version, mimetype, build):
+    entry = _entries.get(mimetype)
+    if entry and entry.version == version:
+        return entry
+    with _lock:
+        # another thread may have rebuilt it while we waited
+        entry = _entries.get(mimetype)
+        if not entry or entry.version != version:
+            resp = make_response(build())
+            etag = f"items-{version}-{mimetype.rsplit('/', 1)[1]}"
+            entry = _entries[mimetype] = Entry(version, etag, resp.mimetype, resp.get_data())
+        return entry
+
+def serve(cur, build):
+    """
+    Responds from the cache for the current version, calling build() (which
+    returns a normal view response) only when the version has moved on.
+    """
+    mimetype = formats.negotiate()
+    entry = _entry(current_version(cur), mimetype, build)
+    use_gzip = request.accept_encodings["gzip"] > 0
+    etag = entry.etag + ("-gz" if use_gzip else "")
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+    else:
+        resp = make_response(entry.gzipped if use_gzip else entry.body)
+        resp.mimetype = entry.mimetype
+        if use_gzip:
+            resp.headers["Content-Encoding"] = "gzip"
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.vary.update(("Accept", "Accept-Encoding"))
+    return resp
@@ -0,0 +1,131 @@
+# jobs.py
+# A small persistent job queue stored in bfp_inventory.db. The web process
+# only inserts rows and reads their status; worker.py claims and runs them.
+import json
+import uuid
+from datetime import datetime as dt
+
+PURGE_BATCH = 100
+
+JOB_KINDS = ("export", "reconcile", "archive", "backfill_specs", "snapshot", "duplicates", "import")
+
+def _now():
+    return dt.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def init_jobs_table(cur):
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        params TEXT,
+        input BLOB,
+        progress REAL NOT NULL DEFAULT 0,
+        message TEXT,
+        result BLOB,
+        result_type TEXT,
+        result_name TEXT,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT
+      )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+def submit(conn, kind, params=None, input=None):
+    """Queues a job and returns its id."""
+    jid = str(uuid.uuid4())
+    conn.execute(
+      "INSERT INTO jobs (id, kind, params, input, created_at) VALUES (?,?,?,?,?)",
+      (jid, kind, json.dumps(params or {}), input, _now())
+    )
+    conn.commit()
+    return jid
+
+def get(conn, jid):
+    """Status of a job without its (possibly large) input and result."""
+    row = conn.execute("""
+      SELECT id, kind, status, progress, message, result_type, result_name,
+             created_at, started_at, finished_at
+      FROM jobs WHERE id=?
+    """, (jid,)).fetchone()
+    return dict(row) if row else None
+
+def get_result(conn, jid):
+    return conn.execute(
+      "SELECT status, result, result_type, result_name FROM jobs WHERE id=?", (jid,)
+    ).fetchone()
+
+def latest_result(conn, kind):
+    """The newest finished job of a kind, with its result, or None."""
+    return conn.execute("""
+      SELECT id, result, result_type, finished_at FROM jobs
+      WHERE kind=? AND status='done' ORDER BY finished_at DESC LIMIT 1
+    """, (kind,)).fetchone()
+
+def claim(conn):
+    """
+    Atomically moves the oldest queued job to running and returns it, or
+    None when the queue is empty. Safe with several workers.
+    """
+    row = conn.execute("""
+      UPDATE jobs SET status='running', started_at=?
+      WHERE id = (SELECT id FROM jobs WHERE status='queued' ORDER BY created_at LIMIT 1)
+      RETURNING id, kind, params, input
+    """, (_now(),)).fetchone()
+    conn.commit()
+    if not row:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"] or "{}")
+    return job
+
+def set_progress(conn, jid, progress, message=None):
+    conn.execute("UPDATE jobs SET progress=?, message=? WHERE id=?", (progress, message, jid))
+    conn.commit()
+
+def finish(conn, jid, result, result_type, result_name):
+    conn.execute("""
+      UPDATE jobs SET status='done', progress=1, result=?, result_type=?, result_name=?,
+                      input=NULL, finished_at=?
+      WHERE id=?
+    """, (result, result_type, result_name, _now(), jid))
+    conn.commit()
+
+def fail(conn, jid, message):
+    conn.execute(
+      "UPDATE jobs SET status='failed', message=?, input=NULL, finished_at=? WHERE id=?",
+      (message, _now(), jid)
+    )
+    conn.commit()
+
+def requeue_stale(conn, started_before):
+    """Puts jobs left 'running' by a dead worker back in the queue."""
+    n = conn.execute(
+      "UPDATE jobs SET status='queued', started_at=NULL WHERE status='running' AND started_at < ?",
+      (started_before,)
+    ).rowcount
+    conn.commit()
+    return n
+
+def purge_finished(conn, finished_before, batch_size=PURGE_BATCH):
+    """
+    Deletes done and failed jobs that finished before the cutoff, a batch
+    at a time (results can be large). The newest done job of each kind is
+    kept, so its report stays readable. Returns the number removed.
+    """
+    removed = 0
+    while True:
+        n = conn.execute("""
+          DELETE FROM jobs WHERE id IN (
+            SELECT id FROM jobs j
+            WHERE status IN ('done', 'failed') AND finished_at<?
+              AND NOT (status='done' AND finished_at =
+                (SELECT MAX(finished_at) FROM jobs WHERE kind=j.kind AND status='done'))
+            LIMIT ?
+          )
+        """, (finished_before, batch_size)).rowcount
+        conn.commit()
+        removed += n
+        if n < batch_size:
+            return removed
@@ -0,0 +1,191 @@
+# lookups.py
+# Repeated inventory strings (OS, Office, antivirus, model, CPU, status) are
+# stored once in lookup_values and referenced from inventory by <field>_id.
+# Every worker keeps the id <-> string map in memory; ids never change once
+# issued, so the map only ever needs to pick up rows added by other workers.
+# The exception is a snapshot restore, which may reissue ids: it bumps
+# lookup_generation, and each connection checks that before using the map.
+# The old text columns are dropped by the startup migration once every row
+# has its ids. Deployments still running APIs/app.py on the same database set
+# KEEP_LOOKUP_TEXT_COLUMNS=1: the text columns are then kept and written
+# alongside the ids, until app.py is retired and they are dropped with
+#   python lookups.py drop-text-columns
+import argparse
+import os
+import sqlite3
+import threading
+
+LOOKUP_FIELDS = (
+    "brand_model", "processor", "operating_system",
+    "microsoft_office", "antivirus_software", "status",
+)
+
+KEEP_TEXT_COLUMNS = os.environ.get("KEEP_LOOKUP_TEXT_COLUMNS", "").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+_by_id = {}       # id -> value
+_by_value = {}    # (field, value) -> id
+_by_field = {}    # field -> set of values
+_max_id = 0
+_generation = None   # lookup_generation the map was loaded under
+
+def init_lookup_table(cur):
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS lookup_values (
+        id INTEGER PRIMARY KEY,
+        field TEXT NOT NULL,
+        value TEXT NOT NULL,
+        UNIQUE (field, value)
+      )
+    """)
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS lookup_generation (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        generation INTEGER NOT NULL
+      )
+    """)
+    cur.execute("INSERT OR IGNORE INTO lookup_generation (id, generation) VALUES (1, 1)")
+
+def generation(cur):
+    try:
+        cur.execute("SELECT generation FROM lookup_generation WHERE id=1")
+    except sqlite3.OperationalError:
+        return None
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def check_generation(conn):
+    """
+    Drops the in-memory map if lookup ids were reissued since it was loaded.
+    Call on each new connection, before anything is encoded or decoded.
+    """
+    global _max_id, _generation
+    current = generation(conn.cursor())
+    if current != _generation:
+        with _lock:
+            _by_id.clear()
+            _by_value.clear()
+            _by_field.clear()
+            _max_id, _generation = 0, current
+
+def _remember(rows):
+    global _max_id
+    for r in rows:
+        _by_id[r["id"]] = r["value"]
+        _by_value[(r["field"], r["value"])] = r["id"]
+        _by_field.setdefault(r["field"], set()).add(r["value"])
+        _max_id = max(_max_id, r["id"])
+
+def sync(cur):
+    """Loads lookup rows issued since the last sync (by any worker)."""
+    # inside a write transaction this would also see the connection's own
+    # uncommitted rows, whose ids SQLite may reuse if it rolls back
+    if cur.connection.in_transaction:
+        return
+    cur.execute("SELECT MAX(id) AS max_id FROM lookup_values")
+    latest = cur.fetchone()["max_id"] or 0
+    if latest > _max_id:
+        with _lock:
+            cur.execute("SELECT id, field, value FROM lookup_values WHERE id>?", (_max_id,))
+            _remember(cur.fetchall())
+
+def intern(cur, field, value):
+    """
+    Returns the id for value, inserting it on first sight. None stays None.
+    A new row is part of the caller's transaction; it only reaches the cache
+    through sync() once that transaction has committed.
+    """
+    if value is None:
+        return None
+    value = str(value)
+    lid = _by_value.get((field, value))
+    if lid is None:
+        sync(cur)
+        lid = _by_value.get((field, value))
+    if lid is not None:
+        return lid
+    cur.execute("INSERT OR IGNORE INTO lookup_values (field, value) VALUES (?,?)", (field, value))
+    cur.execute("SELECT id FROM lookup_values WHERE field=? AND value=?", (field, value))
+    return cur.fetchone()["id"]
+
+def encode(cur, data):
+    """Returns the <field>_id values for an item payload, in LOOKUP_FIELDS order."""
+    return tuple(intern(cur, f, data[f]) for f in LOOKUP_FIELDS)
+
+def decode(cur, row):
+    """Replaces the <field>_id keys of a row dict with their string values."""
+    ids = [row.get(f + "_id") for f in LOOKUP_FIELDS]
+    if any(i is not None and i not in _by_id for i in ids):
+        sync(cur)
+    for f, i in zip(LOOKUP_FIELDS, ids):
+        row.pop(f + "_id", None)
+        row[f] = _by_id.get(i)
+    return row
+
+def row_decoder(cur, columns):
+    """
+    For plain cursor rows: returns the output column names (<field>_id becomes
+    <field>) and a function turning a row into a tuple with the ids decoded.
+    cur is only used to sync, so pass one that is not being iterated.
+    """
+    ids = {i for i, c in enumerate(columns) if c.endswith("_id") and c[:-3] in LOOKUP_FIELDS}
+    names = [c[:-3] if i in ids else c for i, c in enumerate(columns)]
+    def decode_row(row):
+        if any(row[i] is not None and row[i] not in _by_id for i in ids):
+            sync(cur)
+        return tuple(_by_id.get(v) if i in ids else v for i, v in enumerate(row))
+    return names, decode_row
+
+def values(cur, field, prefix=""):
+    """Sorted known values for a field, optionally filtered by a case-insensitive prefix."""
+    sync(cur)
+    prefix = prefix.lower()
+    return sorted(v for v in _by_field.get(field, ()) if v.lower().startswith(prefix))
+
+def text_columns(cur):
+    """The LOOKUP_FIELDS still present as text columns of inventory."""
+    cols = {r["name"] for r in cur.execute("PRAGMA table_info(inventory)")}
+    return tuple(f for f in LOOKUP_FIELDS if f in cols)
+
+def backfill_lookups(cur):
+    """
+    Fills the lookup ids of rows that only have the text columns set: every
+    row on the first migration, later only rows written by APIs/app.py.
+    """
+    missing = " OR ".join(f"({f}_id IS NULL AND {f} IS NOT NULL)" for f in LOOKUP_FIELDS)
+    cur.execute(f"SELECT id, {', '.join(LOOKUP_FIELDS)} FROM inventory WHERE {missing}")
+    updates = [(*encode(cur, r), r["id"]) for r in cur.fetchall()]
+    cur.executemany(
+      f"UPDATE inventory SET {', '.join(f + '_id=?' for f in LOOKUP_FIELDS)} WHERE id=?",
+      updates
+    )
+
+def drop_text_columns(cur):
+    """Drops the text columns once every row has its lookup ids. Does not commit."""
+    present = text_columns(cur)
+    if not present:
+        return 0
+    missing = " OR ".join(f"({f}_id IS NULL AND {f} IS NOT NULL)" for f in present)
+    cur.execute(f"SELECT COUNT(*) AS n FROM inventory WHERE {missing}")
+    left = cur.fetchone()["n"]
+    if left:
+        raise RuntimeError(f"{left} rows have no lookup ids yet; start the app once to backfill them")
+    for f in present:
+        cur.execute(f"ALTER TABLE inventory DROP COLUMN {f}")
+    return len(present)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the lookup_values encoding.")
+    parser.add_argument("command", choices=("drop-text-columns",))
+    args = parser.parse_args()
+
+    # APIs/app.py reads these columns: stop it before dropping them
+    conn = sqlite3.connect("bfp_inventory.db")
+    conn.row_factory = sqlite3.Row
+    try:
+        dropped = drop_text_columns(conn.cursor())
+        conn.commit()
+        print(f"✅ Dropped {dropped} text columns from inventory")
+    except RuntimeError as e:
+        print(f"⚠️ {e}")
+    conn.close()
@@ -1,15 +1,44 @@
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, Response
 from flask_cors import CORS
 import sqlite3
+import csv
 import uuid
 import bcrypt
 import jwt
 import datetime
+import io
+import json
+import os
+import shutil
+import time
 from datetime import datetime as dt
 
+from backfill import backfill_mac_int, backfill_specs
+import access
+import admission
+import archive
+import dedupe
+import formats
+import health
+import availability
+import history
+import idempotency
+import itemcache
+import jobs
+import lookups
+import reconcile
+import schema
+import sessions
+import snapshot
+import timeouts
+from idempotency import idempotent
+from normalize import normalize_mac, parse_ram_mb, parse_storage
+
 app = Flask(__name__)
 CORS(app)
+admission.init_app(app)
+timeouts.init_app(app)
 
 # ─── CONFIG ────────────────────────────────────────────────────────────────────
 app.config['SECRET_KEY'] = 'your_secret_key_here'  # change in production!
@@ -18,12 +47,13 @@ app.config['SECRET_KEY'] = 'your_secret_key_here'  # change in production!
 def get_inventory_conn():
     conn = sqlite3.connect("bfp_inventory.db")
     conn.row_factory = sqlite3.Row
-    return conn
+    lookups.check_generation(conn)
+    return timeouts.limit(conn)
 
 def get_user_conn():
     conn = sqlite3.connect("users.db")
     conn.row_factory = sqlite3.Row
-    return conn
+    return timeouts.limit(conn)
 
 # ─── INITIALIZE USERS TABLE ────────────────────────────────────────────────────
 def init_user_db():
@@ -40,35 +70,158 @@ def init_user_db():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
       )
     """)
+    sessions.init_sessions_table(cur)
+    access.init_access_table(cur)
     conn.commit()
+    availability.sync(cur)
     conn.close()
 
 init_user_db()
 
+# ─── INITIALIZE INVENTORY TABLES ──────────────────────────────────────────────
+# Columns a user edit can change; only these should bump the row timestamp.
+ITEM_COLUMNS = (
+    "office_id", "computer_device", "pc_name", "motherboard", "ram",
+    "graphics_processing", "internal_memory", "mac_address",
+) + tuple(f + "_id" for f in lookups.LOOKUP_FIELDS)
+
+UPDATE_TRIGGER_SQL = f"""CREATE TRIGGER set_timestamp_on_update
+AFTER UPDATE OF {",".join(ITEM_COLUMNS)} ON inventory
+FOR EACH ROW
+BEGIN
+  UPDATE inventory SET timestamp = datetime('now') WHERE id = OLD.id;
+END"""
+
+def init_inventory_db():
+    conn = get_inventory_conn()
+    cur = conn.cursor()
+    # WAL lets the job worker and the web workers read while one of them writes
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS offices (
+        property INTEGER PRIMARY KEY AUTOINCREMENT,
+        office_name TEXT NOT NULL UNIQUE
+      )
+    """)
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS inventory (
+        id TEXT PRIMARY KEY,
+        office_id TEXT,
+        computer_device TEXT,
+        pc_name TEXT,
+        motherboard TEXT,
+        ram TEXT,
+        graphics_processing TEXT,
+        internal_memory TEXT,
+        mac_address TEXT,
+        brand_model TEXT,
+        processor TEXT,
+        operating_system TEXT,
+        microsoft_office TEXT,
+        antivirus_software TEXT,
+        status TEXT,
+        timestamp TEXT,
+        mac_int INTEGER,
+        ram_mb INTEGER,
+        storage_gb INTEGER,
+        storage_type TEXT,
+        brand_model_id INTEGER,
+        processor_id INTEGER,
+        operating_system_id INTEGER,
+        microsoft_office_id INTEGER,
+        antivirus_software_id INTEGER,
+        status_id INTEGER
+      )
+    """)
+    lookups.init_lookup_table(cur)
+    history.init_history_table(cur)
+
+    # The timestamp trigger is lifted while migrating, otherwise backfilling
+    # derived columns would stamp every row with "now".
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='set_timestamp_on_update'")
+    had_trigger = cur.fetchone() is not None
+    cur.execute("DROP TRIGGER IF EXISTS set_timestamp_on_update")
+    try:
+        migrate_inventory(cur)
+    finally:
+        if had_trigger:
+            cur.execute(UPDATE_TRIGGER_SQL)
+    archive.init_archive_table(cur)
+    jobs.init_jobs_table(cur)
+    idempotency.init_idempotency_table(cur)
+    itemcache.init_version_table(cur)
+    dedupe.init_dedupe_table(cur)
+    conn.commit()
+    text_columns = lookups.text_columns(cur)
+    conn.close()
+    return text_columns
+
+def migrate_inventory(cur):
+    cols = {r["name"] for r in cur.execute("PRAGMA table_info(inventory)")}
+    if "mac_int" not in cols:
+        cur.execute("ALTER TABLE inventory ADD COLUMN mac_int INTEGER")
+        backfill_mac_int(cur)
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_inventory_mac_int ON inventory(mac_int)")
+
+    if "ram_mb" not in cols:
+        cur.execute("ALTER TABLE inventory ADD COLUMN ram_mb INTEGER")
+        cur.execute("ALTER TABLE inventory ADD COLUMN storage_gb INTEGER")
+        cur.execute("ALTER TABLE inventory ADD COLUMN storage_type TEXT")
+        backfill_specs(cur)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_ram_mb ON inventory(ram_mb)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_storage ON inventory(storage_gb, storage_type)")
+
+    # Repeated strings move into lookup_values and the text columns go,
+    # unless KEEP_LOOKUP_TEXT_COLUMNS keeps them for APIs/app.py; while they
+    # stay, rows that only have them (written by app.py) get their ids on
+    # every start.
+    if "status_id" not in cols:
+        for f in lookups.LOOKUP_FIELDS:
+            cur.execute(f"ALTER TABLE inventory ADD COLUMN {f}_id INTEGER")
+    if lookups.text_columns(cur):
+        lookups.backfill_lookups(cur)
+        if not lookups.KEEP_TEXT_COLUMNS:
+            lookups.drop_text_columns(cur)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_status ON inventory(status_id)")
+    # listings for office-scoped users filter on office_id
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_office ON inventory(office_id)")
+
+# lookup fields still written as text next to their ids, see lookups.py
+TEXT_COLUMNS = init_inventory_db()
+
 # ─── AUTH HELPERS ──────────────────────────────────────────────────────────────
-def gen_tokens(user_id):
-    access = jwt.encode(
-      {'user_id': user_id, 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=15)},
+REFRESH_TTL = datetime.timedelta(days=7)
+
+def gen_tokens(user_id, offices):
+    # office grants ride in the access token so routes never look them up
+    access_token = jwt.encode(
+      {'user_id': user_id, 'typ': 'access', 'offices': offices,
+       'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=15)},
       app.config['SECRET_KEY'], algorithm="HS256"
     )
+    # jti keeps two logins in the same second from minting the same token
     refresh = jwt.encode(
-      {'user_id': user_id, 'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7)},
+      {'user_id': user_id, 'jti': str(uuid.uuid4()), 'exp': datetime.datetime.utcnow() + REFRESH_TTL},
       app.config['SECRET_KEY'], algorithm="HS256"
     )
-    return access, refresh
+    return access_token, refresh
 
 # ─── AUTH ROUTES ───────────────────────────────────────────────────────────────
 @app.route("/register", methods=["POST"])
 def register():
-    data = request.json
-    if not all(k in data for k in ("username","email","password","confirmPassword")):
-        return jsonify(error="All fields required"),400
+    data, errors = schema.validate_register(request.get_json(silent=True))
+    if errors:
+        return jsonify(error="Invalid registration", fields=errors),400
     if data["password"] != data["confirmPassword"]:
         return jsonify(error="Passwords must match"),400
 
+    conn = get_user_conn(); cur = conn.cursor()
+    # reject known duplicates before spending a bcrypt hash on them
+    if any(availability.taken(cur, f, data[f]) for f in availability.FIELDS):
+        conn.close()
+        return jsonify(error="Username or email already exists"),400
     hashed = bcrypt.hashpw(data["password"].encode(), bcrypt.gensalt())
     user_id = str(uuid.uuid4())
-    conn = get_user_conn(); cur = conn.cursor()
     try:
         cur.execute(
           "INSERT INTO users (user_id,username,email,password) VALUES (?,?,?,?)",
@@ -78,12 +231,26 @@ def register():
     except sqlite3.IntegrityError:
         conn.close()
         return jsonify(error="Username or email already exists"),400
+    availability.add(data["username"], data["email"])
     conn.close()
     return jsonify(message="User registered successfully"),201
 
+@app.route("/users/available", methods=["GET"])
+def users_available():
+    """?username=...&email=... -> {field: true/false} for each one given."""
+    asked = {f: request.args[f] for f in availability.FIELDS if request.args.get(f)}
+    if not asked:
+        return jsonify(error="username or email required"),400
+    conn = get_user_conn(); cur = conn.cursor()
+    result = {f: not availability.taken(cur, f, v) for f, v in asked.items()}
+    conn.close()
+    return jsonify(result),200
+
 @app.route("/login", methods=["POST"])
 def login():
-    data = request.json
+    data, errors = schema.validate_login(request.get_json(silent=True))
+    if errors:
+        return jsonify(error="Invalid username or password", fields=errors),400
     conn = get_user_conn(); cur = conn.cursor()
     cur.execute("SELECT * FROM users WHERE username=?", (data.get("username"),))
     user = cur.fetchone()
@@ -91,10 +258,11 @@ def login():
         conn.close()
         return jsonify(error="Invalid username or password"),401
 
-    access, refresh = gen_tokens(user["user_id"])
-    cur.execute("UPDATE users SET refresh_token=? WHERE user_id=?", (refresh,user["user_id"]))
+    access_token, refresh = gen_tokens(user["user_id"], access.load_claims(cur, user["user_id"]))
+    device = data.get("device") or request.headers.get("User-Agent", "")[:200]
+    sessions.create(cur, user["user_id"], refresh, device, time.time() + REFRESH_TTL.total_seconds())
     conn.commit(); conn.close()
-    return jsonify(access_token=access, refresh_token=refresh),200
+    return jsonify(access_token=access_token, refresh_token=refresh),200
 
 @app.route("/refresh", methods=["POST"])
 def refresh():
@@ -109,113 +277,584 @@ def refresh():
         return jsonify(error="Invalid refresh token"),403
 
     conn = get_user_conn(); cur = conn.cursor()
-    cur.execute("SELECT 1 FROM users WHERE user_id=? AND refresh_token=?", (payload["user_id"],token))
-    if not cur.fetchone():
+    user_id = sessions.validate(cur, token)
+    if user_id != payload["user_id"]:
         conn.close()
         return jsonify(error="Invalid refresh token"),403
-    new_access, _ = gen_tokens(payload["user_id"])
+    # grants are re-read here, so changes apply within one access-token lifetime
+    new_access, _ = gen_tokens(user_id, access.load_claims(cur, user_id))
     conn.close()
     return jsonify(access_token=new_access),200
 
+@app.route("/logout", methods=["POST"])
+def logout():
+    """Ends the session for one device; other devices stay logged in."""
+    token = (request.json or {}).get("refresh_token")
+    if not token:
+        return jsonify(error="Refresh token required"),400
+    conn = get_user_conn(); cur = conn.cursor()
+    sessions.revoke(cur, token)
+    conn.commit(); conn.close()
+    return jsonify(message="Logged out"),200
+
+# ─── INVENTORY HELPERS ────────────────────────────────────────────────────────
+def find_by_mac(cur, mac_int):
+    """Returns the id of the item holding this MAC, using the mac_int index."""
+    if mac_int is None:
+        return None
+    cur.execute("SELECT id FROM inventory WHERE mac_int=?", (mac_int,))
+    row = cur.fetchone()
+    return row["id"] if row else None
+
+def parse_specs(data):
+    """Returns (ram_mb, storage_gb, storage_type) for an item payload."""
+    return (parse_ram_mb(data["ram"]), *parse_storage(data["internal_memory"]))
+
+def include_archived():
+    return request.args.get("include_archived", "").lower() in ("1", "true", "yes")
+
+def fetch_item(cur, column, value, archived=False):
+    """
+    Looks one item up by id or mac_int with its office name. The archive is
+    only searched when archived is set and the item is not in inventory.
+    """
+    for table in ("inventory", "inventory_archive") if archived else ("inventory",):
+        cur.execute(f"""
+          SELECT i.*,o.office_name
+          FROM {table} i
+          JOIN offices o ON i.office_id=o.property
+          WHERE i.{column}=?
+        """,(value,))
+        row = cur.fetchone()
+        if row:
+            return lookups.decode(cur, dict(row))
+    return None
+
+def load_item(cur, item_id):
+    """Returns the item as a decoded dict, or None."""
+    cur.execute("SELECT * FROM inventory WHERE id=?", (item_id,))
+    row = cur.fetchone()
+    return lookups.decode(cur, dict(row)) if row else None
+
+# query arg -> (predicate, multiplier applied to the value)
+RANGE_FILTERS = {
+    "min_ram_gb": ("i.ram_mb >= ?", 1024),
+    "max_ram_gb": ("i.ram_mb <= ?", 1024),
+    "min_storage_gb": ("i.storage_gb >= ?", 1),
+    "max_storage_gb": ("i.storage_gb <= ?", 1),
+}
+
+def item_filters(args, scope):
+    """
+    Builds a WHERE clause from the /items query string, limited to the
+    offices the caller may read. Raises ValueError on a non-numeric range value.
+    """
+    clauses, params = [], []
+    pred, office_ids = scope.predicate("i.office_id")
+    if pred:
+        clauses.append(pred)
+        params.extend(office_ids)
+    for arg, (pred, mult) in RANGE_FILTERS.items():
+        if args.get(arg) not in (None, ""):
+            clauses.append(pred)
+            params.append(float(args[arg]) * mult)
+    if args.get("storage_type"):
+        clauses.append("i.storage_type = ?")
+        params.append(args["storage_type"].lower())
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
 # ─── INVENTORY ROUTES ─────────────────────────────────────────────────────────
 @app.route('/offices', methods=['GET'])
 def get_offices():
     conn = get_inventory_conn(); cur = conn.cursor()
     cur.execute("SELECT property,office_name FROM offices")
-    offs = [{"id":r["property"],"name":r["office_name"]} for r in cur.fetchall()]
+    resp = formats.rows_response(("id", "name"), cur)
     conn.close()
-    return jsonify(offs),200
+    return resp
+
+@app.route('/lookups', methods=['GET'])
+@access.requires("read")
+def get_lookups():
+    conn = get_inventory_conn(); cur = conn.cursor()
+    out = {f: lookups.values(cur, f) for f in lookups.LOOKUP_FIELDS}
+    conn.close()
+    return jsonify(out),200
+
+@app.route('/lookups/<string:field>', methods=['GET'])
+@access.requires("read")
+def get_lookup(field):
+    if field not in lookups.LOOKUP_FIELDS:
+        return jsonify(error="Unknown field"),404
+    conn = get_inventory_conn(); cur = conn.cursor()
+    out = lookups.values(cur, field, request.args.get("q", ""))
+    conn.close()
+    return jsonify(out),200
 
 @app.route('/items', methods=['GET'])
+@access.requires("read")
 def get_items():
-    conn = get_inventory_conn(); cur = conn.cursor()
-    cur.execute("""
-      SELECT i.id,i.pc_name,i.brand_model,i.processor,i.motherboard,i.ram,
+    # the cached body holds every office, so only unrestricted readers get it
+    if not request.args and g.scope.everywhere():
+        conn = get_inventory_conn(); cur = conn.cursor()
+        resp = itemcache.serve(cur, list_items)
+        conn.close()
+        return resp
+    return list_items()
+
+def list_items():
+    try:
+        where, params = item_filters(request.args, g.scope)
+    except ValueError:
+        return jsonify(error="Range filters must be numeric"),400
+    sql = """
+      SELECT i.id,i.pc_name,i.brand_model_id,i.processor_id,i.motherboard,i.ram,
              i.graphics_processing,i.internal_memory,i.mac_address,
-             i.operating_system,i.microsoft_office,i.antivirus_software,
-             i.status,i.timestamp,i.computer_device,i.office_id,o.office_name
-      FROM inventory i
+             i.operating_system_id,i.microsoft_office_id,i.antivirus_software_id,
+             i.status_id,i.timestamp,i.computer_device,i.office_id,o.office_name{flag}
+      FROM {table} i
       JOIN offices o ON i.office_id=o.property
-    """)
-    rows = [dict(r) for r in cur.fetchall()]
+    """ + where
+    if include_archived():
+        sql = (sql.format(flag=",0 AS archived", table="inventory") + " UNION ALL " +
+               sql.format(flag=",1 AS archived", table="inventory_archive"))
+        params = params * 2
+    else:
+        sql = sql.format(flag="", table="inventory")
+    conn = get_inventory_conn(); cur = conn.cursor()
+    cur.execute(sql, params)
+    columns, decode = lookups.row_decoder(conn.cursor(), [d[0] for d in cur.description])
+    resp = formats.rows_response(columns, map(decode, cur))
+    conn.close()
+    return resp
+
+INSERT_COLUMNS = (
+    "id", "office_id", "computer_device", "pc_name", "motherboard", "ram", "graphics_processing",
+    "internal_memory", "mac_address", "timestamp", "mac_int", "ram_mb", "storage_gb", "storage_type",
+) + tuple(f + "_id" for f in lookups.LOOKUP_FIELDS) + TEXT_COLUMNS
+INSERT_ITEM_SQL = f"""
+  INSERT INTO inventory ({",".join(INSERT_COLUMNS)})
+  VALUES ({",".join("?" * len(INSERT_COLUMNS))})
+"""
+
+def item_params(cur, iid, data, ts):
+    """INSERT_ITEM_SQL parameters for a validated item payload."""
+    return (
+      iid,data["office_id"],data["computer_device"],data["pc_name"],data["motherboard"],
+      data["ram"],data["graphics_processing"],data["internal_memory"],data["mac_address"],
+      ts,normalize_mac(data["mac_address"]),*parse_specs(data),*lookups.encode(cur, data),
+      *(data[f] for f in TEXT_COLUMNS)
+    )
+
+def insert_item(cur, iid, data, ts):
+    cur.execute(INSERT_ITEM_SQL, item_params(cur, iid, data, ts))
+    dedupe.index_item(cur, iid)
+
+def import_items(cur, items, ts):
+    """
+    Inserts validated items and their history, without committing. Returns
+    (ids, errors): errors maps item index to a MAC clash, and when it is not
+    empty nothing was inserted. Shared by /items/bulk and the import job.
+    """
+    errors, seen = {}, {}
+    for i, data in enumerate(items):
+        mac_int = normalize_mac(data["mac_address"])
+        if mac_int is None:
+            continue
+        dup = seen.get(mac_int) or find_by_mac(cur, mac_int)
+        if dup:
+            errors[i] = {"mac_address": f"already registered to {dup}"}
+        seen[mac_int] = f"item {i} of this request"
+    if errors:
+        return None, errors
+    ids = [str(uuid.uuid4()) for _ in items]
+    for iid, data in zip(ids, items):
+        insert_item(cur, iid, data, ts)
+    history.record(cur, [(iid, ts, "create", history.diff(None, data)) for iid, data in zip(ids, items)])
+    return ids, {}
+
+def may_write_body(*args, **kwargs):
+    """Replay check for item payloads: each office in the body must be writable."""
+    body = request.get_json(silent=True)
+    for data in body if isinstance(body, list) else [body]:
+        # invalid records are left to the handler, which answers 400
+        if isinstance(data, dict) and data.get("office_id") not in (None, "") \
+                and not g.scope.can("write", data["office_id"]):
+            return access.forbidden()
+    return None
+
+def may_write_item(item_id):
+    """Replay check for an item route: the body's and the item's offices."""
+    denied = may_write_body()
+    if denied is not None:
+        return denied
+    conn = get_inventory_conn(); cur = conn.cursor()
+    cur.execute("SELECT office_id FROM inventory WHERE id=?", (item_id,))
+    row = cur.fetchone()
     conn.close()
-    return jsonify(rows),200
+    if row and not g.scope.can("write", row["office_id"]):
+        return access.forbidden()
+    return None
 
 @app.route('/items', methods=['POST'])
+@access.requires("write")
+@idempotent(authorize=may_write_body)
 def add_item():
-    data = request.json
+    data, errors = schema.validate_item(request.get_json(silent=True))
+    if errors:
+        return jsonify(error="Invalid item", fields=errors),400
+    if not g.scope.can("write", data["office_id"]):
+        return access.forbidden()
     ts = dt.now().strftime("%Y-%m-%d %H:%M:%S")
     iid = str(uuid.uuid4())
     conn = get_inventory_conn(); cur = conn.cursor()
+    dup = find_by_mac(cur, normalize_mac(data["mac_address"]))
+    if dup:
+        conn.close()
+        return jsonify(error="MAC address already registered", id=dup),409
     try:
-        cur.execute("""
-          INSERT INTO inventory (
-            id,office_id,computer_device,pc_name,brand_model,processor,motherboard,
-            ram,graphics_processing,internal_memory,mac_address,operating_system,
-            microsoft_office,antivirus_software,status,timestamp
-          ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-        """, (
-          iid,data["office_id"],data["computer_device"],data["pc_name"],data["brand_model"],
-          data["processor"],data["motherboard"],data["ram"],data["graphics_processing"],
-          data["internal_memory"],data["mac_address"],data["operating_system"],
-          data["microsoft_office"],data["antivirus_software"],data["status"],ts
-        ))
+        insert_item(cur, iid, data, ts)
+        history.record(cur, [(iid, ts, "create", history.diff(None, data))])
         conn.commit()
+        # a warning only: the item is saved either way
+        dupes = [d for d in dedupe.candidates(cur, iid) if g.scope.can("read", d["office_id"])]
+        if dupes:
+            return jsonify(message="Item added successfully", id=iid, possible_duplicates=dupes),201
         return jsonify(message="Item added successfully", id=iid),201
     except sqlite3.IntegrityError as e:
         return jsonify(error=str(e)),400
     finally:
         conn.close()
 
+@app.route('/items/bulk', methods=['POST'])
+@access.requires("write")
+@idempotent(authorize=may_write_body)
+def add_items_bulk():
+    """
+    All-or-nothing import of a JSON array of items in one transaction.
+    Large imports belong on POST /items/import, which runs on the job worker.
+    """
+    items, errors = schema.validate_items(request.get_json(silent=True))
+    if errors:
+        return jsonify(error="Invalid items", items=errors),400
+    if not all(g.scope.can("write", data["office_id"]) for data in items):
+        return access.forbidden()
+    ts = dt.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = get_inventory_conn(); cur = conn.cursor()
+    try:
+        ids, errors = import_items(cur, items, ts)
+        if errors:
+            return jsonify(error="MAC address already registered", items=errors),409
+        conn.commit()
+        return jsonify(message=f"{len(ids)} items added", ids=ids),201
+    except sqlite3.IntegrityError as e:
+        return jsonify(error=str(e)),400
+    finally:
+        conn.close()
+
+@app.route('/items/import', methods=['POST'])
+@access.requires("write")
+@idempotent(authorize=may_write_body)
+def queue_import():
+    """
+    The /items/bulk body (up to MAX_IMPORT items), imported all-or-nothing
+    on the job worker; poll /jobs/<id>, whose result lists the new ids.
+    """
+    items, errors = schema.validate_import(request.get_json(silent=True))
+    if errors:
+        return jsonify(error="Invalid items", items=errors),400
+    if not all(g.scope.can("write", data["office_id"]) for data in items):
+        return access.forbidden()
+    conn = get_inventory_conn()
+    # the worker checks offices against the submitter's write claim again
+    jid = jobs.submit(conn, "import", {"write": g.scope.write}, request.get_data())
+    conn.close()
+    return jsonify(id=jid, status="queued"),202
+
+@app.route('/items/duplicates', methods=['GET'])
+@access.requires("read", everywhere=True)
+def get_duplicates():
+    """The most recent duplicates report; POST /items/duplicates makes a new one."""
+    conn = get_inventory_conn()
+    row = jobs.latest_result(conn, "duplicates")
+    conn.close()
+    if not row:
+        return jsonify(error="No duplicates report yet"),404
+    return jsonify(**json.loads(row["result"]), job_id=row["id"], generated_at=row["finished_at"]),200
+
+@app.route('/items/duplicates', methods=['POST'])
+@access.requires("read", everywhere=True)
+@idempotent
+def queue_duplicates():
+    """
+    Queues a full duplicates report on the job worker; ?threshold=0..1
+    (default DEDUPE_THRESHOLD). GET /items/duplicates returns it once done.
+    """
+    try:
+        threshold = float(request.args.get("threshold", dedupe.THRESHOLD))
+    except ValueError:
+        return jsonify(error="threshold must be a number"),400
+    conn = get_inventory_conn()
+    jid = jobs.submit(conn, "duplicates", {"threshold": threshold})
+    conn.close()
+    return jsonify(id=jid, status="queued"),202
+
 @app.route('/items/<string:item_id>', methods=['GET'])
+@access.requires("read")
 def get_item(item_id):
     conn = get_inventory_conn(); cur = conn.cursor()
-    cur.execute("""
-      SELECT i.*,o.office_name
-      FROM inventory i
-      JOIN offices o ON i.office_id=o.property
-      WHERE i.id=?
-    """,(item_id,))
-    row = cur.fetchone()
+    row = fetch_item(cur, "id", item_id, include_archived())
     conn.close()
-    if not row:
+    if not row or not g.scope.can("read", row["office_id"]):
         return jsonify(error="Item not found"),404
-    return jsonify(dict(row)),200
+    return formats.record_response(row)
+
+@app.route('/items/by-mac/<string:mac>', methods=['GET'])
+@access.requires("read")
+def get_item_by_mac(mac):
+    mac_int = normalize_mac(mac)
+    if mac_int is None:
+        return jsonify(error="Invalid MAC address"),400
+    conn = get_inventory_conn(); cur = conn.cursor()
+    row = fetch_item(cur, "mac_int", mac_int, include_archived())
+    conn.close()
+    if not row or not g.scope.can("read", row["office_id"]):
+        return jsonify(error="Item not found"),404
+    return formats.record_response(row)
 
 @app.route('/items/<string:item_id>', methods=['PUT'])
+@access.requires("write")
+@idempotent(authorize=may_write_item)
 def update_item(item_id):
-    data = request.json
+    data, errors = schema.validate_item(request.get_json(silent=True))
+    if errors:
+        return jsonify(error="Invalid item", fields=errors),400
     ts = dt.now().strftime("%Y-%m-%d %H:%M:%S")
+    mac_int = normalize_mac(data["mac_address"])
     conn = get_inventory_conn(); cur = conn.cursor()
-    cur.execute("SELECT 1 FROM inventory WHERE id=?", (item_id,))
-    if not cur.fetchone():
+    old = load_item(cur, item_id)
+    if not old:
         conn.close()
         return jsonify(error="Item not found"),404
+    # moving an item needs write access on both offices
+    if not (g.scope.can("write", old["office_id"]) and g.scope.can("write", data["office_id"])):
+        conn.close()
+        return access.forbidden()
+    dup = find_by_mac(cur, mac_int)
+    if dup and dup != item_id:
+        conn.close()
+        return jsonify(error="MAC address already registered", id=dup),409
 
-    cur.execute("""
+    cur.execute(f"""
       UPDATE inventory
-      SET office_id=?,computer_device=?,pc_name=?,brand_model=?,processor=?,
-          motherboard=?,ram=?,graphics_processing=?,internal_memory=?,
-          mac_address=?,operating_system=?,microsoft_office=?,antivirus_software=?,
-          status=?,timestamp=?
+      SET office_id=?,computer_device=?,pc_name=?,motherboard=?,ram=?,
+          graphics_processing=?,internal_memory=?,mac_address=?,timestamp=?,
+          mac_int=?,ram_mb=?,storage_gb=?,storage_type=?,
+          brand_model_id=?,processor_id=?,operating_system_id=?,microsoft_office_id=?,
+          antivirus_software_id=?,status_id=?{"".join(f",{f}=?" for f in TEXT_COLUMNS)}
       WHERE id=?
     """,(
-      data["office_id"],data["computer_device"],data["pc_name"],data["brand_model"],
-      data["processor"],data["motherboard"],data["ram"],data["graphics_processing"],
-      data["internal_memory"],data["mac_address"],data["operating_system"],
-      data["microsoft_office"],data["antivirus_software"],data["status"],ts,
-      item_id
+      data["office_id"],data["computer_device"],data["pc_name"],data["motherboard"],
+      data["ram"],data["graphics_processing"],data["internal_memory"],data["mac_address"],
+      ts,mac_int,*parse_specs(data),*lookups.encode(cur, data),
+      *(data[f] for f in TEXT_COLUMNS),item_id
     ))
+    dedupe.index_item(cur, item_id)
+    history.record(cur, [(item_id, ts, "update", history.diff(old, data))])
     conn.commit(); conn.close()
     return jsonify(message="Item updated successfully"),200
 
 @app.route('/items/<string:item_id>', methods=['DELETE'])
+@access.requires("write")
 def delete_item(item_id):
+    ts = dt.now().strftime("%Y-%m-%d %H:%M:%S")
     conn = get_inventory_conn(); cur = conn.cursor()
+    old = load_item(cur, item_id)
+    if old and not g.scope.can("write", old["office_id"]):
+        conn.close()
+        return access.forbidden()
     cur.execute("DELETE FROM inventory WHERE id=?", (item_id,))
+    dedupe.unindex_item(cur, item_id)
+    if old:
+        history.record(cur, [(item_id, ts, "delete", history.diff(old, None))])
     conn.commit(); conn.close()
     return jsonify(message="Item deleted successfully"),200
 
+@app.route('/items/<string:item_id>/history', methods=['GET'])
+@access.requires("read")
+def get_item_history(item_id):
+    conn = get_inventory_conn(); cur = conn.cursor()
+    if not g.scope.everywhere():
+        item = fetch_item(cur, "id", item_id, archived=True)
+        if not item or not g.scope.can("read", item["office_id"]):
+            conn.close()
+            return jsonify(error="Item not found"),404
+    out = history.item_history(cur, item_id, request.args.get("since"), request.args.get("until"))
+    conn.close()
+    return jsonify(out),200
+
+@app.route('/history', methods=['GET'])
+@access.requires("read", everywhere=True)
+def get_history():
+    try:
+        limit = min(int(request.args.get("limit", 500)), 5000)
+    except ValueError:
+        return jsonify(error="limit must be an integer"),400
+    conn = get_inventory_conn(); cur = conn.cursor()
+    out = history.changes_between(cur, request.args.get("since"), request.args.get("until"), limit)
+    conn.close()
+    return jsonify(out),200
+
+@app.route('/reconcile', methods=['POST'])
+@access.requires("read", everywhere=True)
+def reconcile_scan():
+    """Accepts the scan as a multipart "file" field or as a raw text/csv body."""
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    conn = get_inventory_conn(); cur = conn.cursor()
+    try:
+        report = reconcile.reconcile(cur, lines)
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify(error=f"Unreadable CSV: {e}"),400
+    finally:
+        conn.close()
+    return jsonify(report),200
+
+# ─── JOB ROUTES ───────────────────────────────────────────────────────────────
+@app.route('/jobs', methods=['POST'])
+@access.requires("write", everywhere=True)
+@idempotent
+def submit_job():
+    """
+    JSON body {"kind": ..., "params": {...}}, or a multipart form with a
+    "kind" field and a "file" upload (reconcile).
+    """
+    upload = request.files.get("file")
+    if upload:
+        kind, params, data = request.form.get("kind"), {}, upload.read()
+    else:
+        body = request.json or {}
+        kind, params, data = body.get("kind"), body.get("params") or {}, None
+    if kind not in jobs.JOB_KINDS:
+        return jsonify(error=f"kind must be one of {', '.join(jobs.JOB_KINDS)}"),400
+    if kind == "reconcile" and not data:
+        return jsonify(error="reconcile needs a CSV file upload"),400
+    if kind == "import":
+        if not data:
+            return jsonify(error="import needs a JSON file upload"),400
+        params = {"write": g.scope.write}
+    conn = get_inventory_conn()
+    jid = jobs.submit(conn, kind, params, data)
+    conn.close()
+    return jsonify(id=jid, status="queued"),202
+
+@app.route('/jobs/<string:job_id>', methods=['GET'])
+@access.requires("write", everywhere=True)
+def get_job(job_id):
+    conn = get_inventory_conn()
+    job = jobs.get(conn, job_id)
+    conn.close()
+    if not job:
+        return jsonify(error="Job not found"),404
+    return jsonify(job),200
+
+@app.route('/jobs/<string:job_id>/result', methods=['GET'])
+@access.requires("write", everywhere=True)
+def get_job_result(job_id):
+    conn = get_inventory_conn()
+    row = jobs.get_result(conn, job_id)
+    conn.close()
+    if not row:
+        return jsonify(error="Job not found"),404
+    if row["status"] != "done":
+        return jsonify(error=f"Job is {row['status']}"),409
+    return Response(row["result"], mimetype=row["result_type"], headers={
+        "Content-Disposition": f'attachment; filename="{row["result_name"]}"'
+    })
+
+# ─── ADMIN ROUTES ─────────────────────────────────────────────────────────────
+@app.route('/admin/snapshots', methods=['GET'])
+@access.requires("write", everywhere=True)
+def list_snapshots():
+    out = [
+        {"name": os.path.basename(p), "size": os.path.getsize(p),
+         "created_at": dt.fromtimestamp(os.path.getmtime(p)).strftime("%Y-%m-%d %H:%M:%S")}
+        for p in snapshot.list_snapshots()
+    ]
+    return jsonify(out),200
+
+@app.route('/admin/snapshots', methods=['POST'])
+@access.requires("write", everywhere=True)
+@idempotent
+def take_snapshot():
+    """Snapshots run on the job worker; poll /jobs/<id> for completion."""
+    conn = get_inventory_conn()
+    jid = jobs.submit(conn, "snapshot")
+    conn.close()
+    return jsonify(id=jid, status="queued"),202
+
+@app.route('/admin/users/<string:username>/offices', methods=['GET'])
+@access.requires("write", everywhere=True)
+def get_user_offices(username):
+    conn = get_user_conn(); cur = conn.cursor()
+    cur.execute("SELECT user_id FROM users WHERE username=?", (username,))
+    user = cur.fetchone()
+    if not user:
+        conn.close()
+        return jsonify(error="User not found"),404
+    out = access.grants(cur, user["user_id"])
+    conn.close()
+    return jsonify(username=username, offices=out, default=access.DEFAULT_OFFICE_SCOPE),200
+
+@app.route('/admin/users/<string:username>/offices', methods=['PUT'])
+@access.requires("write", everywhere=True)
+def set_user_offices(username):
+    """Replaces a user's grants; applies at their next login or token refresh."""
+    rows, errors = schema.validate_grants(request.get_json(silent=True))
+    if errors:
+        return jsonify(error="Invalid grants", items=errors),400
+    conn = get_user_conn(); cur = conn.cursor()
+    cur.execute("SELECT user_id FROM users WHERE username=?", (username,))
+    user = cur.fetchone()
+    if not user:
+        conn.close()
+        return jsonify(error="User not found"),404
+    access.set_grants(cur, user["user_id"], [(r["office_id"], r["can_write"]) for r in rows])
+    conn.commit()
+    out = access.grants(cur, user["user_id"])
+    conn.close()
+    return jsonify(username=username, offices=out),200
+
+@app.route('/admin/admission', methods=['GET'])
+@access.requires("write", everywhere=True)
+def admission_stats():
+    """Current per-route limits and admit/reject counts for this worker process."""
+    return jsonify(pid=os.getpid(), **admission.occupancy(), routes=admission.stats()),200
+
+# ─── HEALTH ───────────────────────────────────────────────────────────────────
+MIN_FREE_DISK_MB = int(os.environ.get("MIN_FREE_DISK_MB", 200))
+
+def probe_sqlite(path):
+    def probe():
+        conn = sqlite3.connect(path, timeout=2)
+        try:
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+        finally:
+            conn.close()
+    return probe
+
+def probe_disk():
+    free_mb = shutil.disk_usage(".").free // (1024 * 1024)
+    if free_mb < MIN_FREE_DISK_MB:
+        raise RuntimeError(f"only {free_mb} MB free")
+
+prober = health.Prober({
+    "inventory_db": probe_sqlite("bfp_inventory.db"),
+    "users_db": probe_sqlite("users.db"),
+    "disk": probe_disk,
+})
+health.init_app(app, prober)
+
 # ─── RUN APP ──────────────────────────────────────────────────────────────────
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,74 @@
+# normalize.py
+import re
+
+# ─── MAC ADDRESSES ─────────────────────────────────────────────────────────────
+# Accepts AA:BB:CC:DD:EE:FF, aa-bb-cc-dd-ee-ff, AABBCCDDEEFF and Cisco-style
+# aabb.ccdd.eeff. Anything else is treated as "not a MAC" rather than guessed at.
+_MAC_PATTERNS = (
+    re.compile(r"^[0-9a-f]{2}([:\- ]?)[0-9a-f]{2}(?:\1[0-9a-f]{2}){4}$"),
+    re.compile(r"^[0-9a-f]{4}\.[0-9a-f]{4}\.[0-9a-f]{4}$"),
+)
+_MAC_SEPARATORS = re.compile(r"[:\-. ]")
+
+def normalize_mac(value):
+    """
+    Returns the MAC address as a 48-bit integer, or None when the value
+    is empty or not a recognisable MAC address.
+    """
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if not any(p.match(text) for p in _MAC_PATTERNS):
+        return None
+    return int(_MAC_SEPARATORS.sub("", text), 16)
+
+def format_mac(mac_int):
+    """Renders a 48-bit integer back as AA:BB:CC:DD:EE:FF."""
+    if mac_int is None:
+        return None
+    raw = "%012X" % mac_int
+    return ":".join(raw[i:i + 2] for i in range(0, 12, 2))
+
+# ─── HARDWARE SPECS ────────────────────────────────────────────────────────────
+# The form sends values like "8", "8GB", "512 GB SSD" or "256GB SSD + 1TB HDD".
+# A bare number is taken to be GB, which is what the Add form asks for.
+_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*(tb|gb|mb)?", re.I)
+_UNIT_MB = {"tb": 1024 * 1024, "gb": 1024, "mb": 1, None: 1024}
+_STORAGE_TYPES = (("nvme", "nvme"), ("ssd", "ssd"), ("hdd", "hdd"), ("emmc", "emmc"))
+
+def _sizes_mb(value):
+    if value is None:
+        return []
+    found = _SIZE.findall(str(value))
+    # "512GB SSD M.2 2280": once any number carries a unit, bare numbers are noise
+    if any(u for _, u in found):
+        found = [(n, u) for n, u in found if u]
+    return [float(n) * _UNIT_MB[u.lower() if u else None] for n, u in found]
+
+def parse_ram_mb(value):
+    """Returns installed RAM in MB, or None when no size can be read."""
+    sizes = _sizes_mb(value)
+    return int(sizes[0]) if sizes else None
+
+def parse_storage(value):
+    """
+    Returns (storage_gb, storage_type). Multiple drives are summed; a mix of
+    drive types is reported as "mixed".
+    """
+    sizes = _sizes_mb(value)
+    gb = int(round(sum(sizes) / 1024)) if sizes else None
+    text = str(value or "").lower()
+    kinds = {kind for key, kind in _STORAGE_TYPES if key in text}
+    if "nvme" in kinds:
+        kinds.discard("ssd")
+    kind = kinds.pop() if len(kinds) == 1 else ("mixed" if kinds else None)
+    return gb, kind
+
+# ─── NAMES ─────────────────────────────────────────────────────────────────────
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_name(value):
+    """"BFP-ADMIN-01" and "bfp admin 01" both become "bfpadmin01"."""
+    if value is None:
+        return ""
+    return _NON_ALNUM.sub("", str(value).lower())
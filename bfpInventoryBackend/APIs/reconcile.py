@@ -0,0 +1,109 @@
+# reconcile.py
+# Compares a physical-count scan (CSV with pc_name, mac and office columns)
+# against inventory. Inventory is loaded once into hash tables keyed on the
+# normalized MAC and PC name; the scan is streamed row by row and probed
+# against them, so neither side is ever held as a list of full rows.
+#   python reconcile.py scan.csv [--out report.json]
+import argparse
+import csv
+import json
+import sqlite3
+
+from normalize import normalize_mac, normalize_name
+
+BATCH_SIZE = 1000
+
+def _office_maps(cur):
+    cur.execute("SELECT property, office_name FROM offices")
+    rows = cur.fetchall()
+    by_id = {str(r["property"]): r["office_name"] for r in rows}
+    by_name = {r["office_name"].strip().lower(): str(r["property"]) for r in rows}
+    return by_id, by_name
+
+def _office_id(value, by_id, by_name):
+    """Scans may carry the office name ("SAO") or its id ("1")."""
+    value = (value or "").strip()
+    if value in by_id:
+        return value
+    return by_name.get(value.lower())
+
+def reconcile(cur, lines, batch_size=BATCH_SIZE):
+    """
+    lines is any iterable of CSV text lines (an open file, an upload stream).
+    Returns a report with missing (in inventory, not scanned), extra
+    (scanned, not in inventory) and moved (found in a different office).
+    """
+    by_id, by_name = _office_maps(cur)
+
+    # build side: one compact tuple per item, indexed by MAC and by name
+    items, by_mac, by_pc = {}, {}, {}
+    cur.execute("SELECT id, pc_name, mac_address, mac_int, office_id FROM inventory")
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        for r in rows:
+            items[r["id"]] = (r["pc_name"], r["mac_address"], str(r["office_id"] or ""))
+            if r["mac_int"] is not None:
+                by_mac[r["mac_int"]] = r["id"]
+            name = normalize_name(r["pc_name"])
+            if name:
+                by_pc.setdefault(name, r["id"])
+
+    # probe side: stream the scan
+    seen, extra, moved = set(), [], []
+    scanned = duplicates = 0
+    reader = csv.DictReader(lines)
+    for line_no, row in enumerate(reader, start=2):
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        pc_name = row.get("pc_name", "")
+        mac = row.get("mac") or row.get("mac_address", "")
+        office = row.get("office") or row.get("office_name") or row.get("office_id", "")
+        scanned += 1
+
+        iid = by_mac.get(normalize_mac(mac)) or by_pc.get(normalize_name(pc_name))
+        if iid is None:
+            extra.append({"line": line_no, "pc_name": pc_name, "mac_address": mac, "office": office})
+            continue
+        if iid in seen:
+            duplicates += 1
+            continue
+        seen.add(iid)
+        scanned_office = _office_id(office, by_id, by_name)
+        if scanned_office is not None and scanned_office != items[iid][2]:
+            moved.append({
+                "id": iid, "pc_name": items[iid][0],
+                "from_office": by_id.get(items[iid][2]), "to_office": by_id.get(scanned_office),
+            })
+
+    missing = [
+        {"id": iid, "pc_name": pc, "mac_address": mac, "office": by_id.get(off)}
+        for iid, (pc, mac, off) in items.items() if iid not in seen
+    ]
+    return {
+        "summary": {
+            "scanned": scanned, "matched": len(seen), "duplicate_scans": duplicates,
+            "missing": len(missing), "extra": len(extra), "moved": len(moved),
+        },
+        "missing": missing,
+        "extra": extra,
+        "moved": moved,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile a physical-count CSV against inventory.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--out", help="write the full report here instead of stdout")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect("bfp_inventory.db")
+    conn.row_factory = sqlite3.Row
+    with open(args.csv_file, newline="", encoding="utf-8-sig") as f:
+        report = reconcile(conn.cursor(), f)
+    conn.close()
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ {report['summary']}")
+    else:
+        print(json.dumps(report, indent=2))
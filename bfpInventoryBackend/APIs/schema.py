@@ -0,0 +1,138 @@
+# schema.py
+# Payload schemas for the JSON routes. Each schema is a dict of field specs
+# compiled once at import into a validator; a validator takes the decoded
+# body and returns (clean, errors). clean holds every declared field (absent
+# optional ones as None, unknown keys dropped); errors maps field -> message.
+# Routes call these before opening a connection or hashing anything.
+from normalize import normalize_mac
+
+MAX_TEXT = 255
+MAX_BULK = 5000
+MAX_IMPORT = 100000   # imports run on the job worker, not in the request
+
+def _int(v):
+    if isinstance(v, bool):
+        raise ValueError
+    if isinstance(v, int):
+        return v
+    if isinstance(v, str) and v.strip().lstrip("-").isdigit():
+        return int(v)
+    raise ValueError
+
+def _str(v):
+    if not isinstance(v, str):
+        raise ValueError
+    return v
+
+def _bool(v):
+    if not isinstance(v, bool):
+        raise ValueError
+    return v
+
+TYPES = {
+    int: (_int, "must be an integer"),
+    str: (_str, "must be a string"),
+    bool: (_bool, "must be true or false"),
+}
+
+def compile_schema(schema):
+    """
+    Turns {field: {"type", "required", "max_len", "check", "message"}} into
+    a validator function. Work per field is one coerce call plus whatever
+    optional checks were declared.
+    """
+    steps = []
+    for name, spec in schema.items():
+        coerce, type_msg = TYPES[spec.get("type", str)]
+        steps.append((
+            name, spec.get("required", False), coerce, type_msg,
+            spec.get("max_len", MAX_TEXT if spec.get("type", str) is str else None),
+            spec.get("check"), spec.get("message", "is invalid"),
+        ))
+    steps = tuple(steps)
+
+    def validate(data):
+        if not isinstance(data, dict):
+            return None, {"_": "expected a JSON object"}
+        clean, errors = {}, {}
+        for name, required, coerce, type_msg, max_len, check, message in steps:
+            v = data.get(name)
+            if v is None or v == "":
+                if required:
+                    errors[name] = "is required"
+                clean[name] = None
+                continue
+            try:
+                v = coerce(v)
+            except ValueError:
+                errors[name] = type_msg
+                continue
+            if max_len is not None and len(v) > max_len:
+                errors[name] = f"must be at most {max_len} characters"
+            elif check is not None and not check(v):
+                errors[name] = message
+            else:
+                clean[name] = v
+        return clean, errors
+    return validate
+
+def compile_bulk(validate_one, max_items=MAX_BULK):
+    """Validator for a JSON array of records; errors are keyed by index."""
+    def validate(data):
+        if not isinstance(data, list):
+            return None, {"_": "expected a JSON array"}
+        if len(data) > max_items:
+            return None, {"_": f"at most {max_items} records per request"}
+        clean, errors = [], {}
+        for i, record in enumerate(data):
+            rec, errs = validate_one(record)
+            if errs:
+                errors[i] = errs
+            else:
+                clean.append(rec)
+        return clean, errors
+    return validate
+
+ITEM = {
+    "office_id": {"type": int, "required": True},
+    "computer_device": {"required": True},
+    "pc_name": {"required": True},
+    "brand_model": {},
+    "processor": {},
+    "motherboard": {},
+    "ram": {},
+    "graphics_processing": {},
+    "internal_memory": {},
+    "mac_address": {"check": lambda v: normalize_mac(v) is not None, "message": "is not a MAC address"},
+    "operating_system": {},
+    "microsoft_office": {},
+    "antivirus_software": {},
+    "status": {},
+}
+
+REGISTER = {
+    "username": {"required": True, "max_len": 50},
+    "email": {"required": True, "check": lambda v: "@" in v, "message": "is not an email address"},
+    # bcrypt only looks at the first 72 bytes
+    "password": {"required": True, "check": lambda v: len(v.encode()) <= 72, "message": "must be at most 72 bytes"},
+    "confirmPassword": {"required": True},
+}
+
+LOGIN = {
+    "username": {"required": True},
+    "password": {"required": True},
+    "device": {"max_len": 200},
+}
+
+# one user_offices row; a null office_id grants every office
+GRANT = {
+    "office_id": {"type": int},
+    "can_write": {"type": bool},
+}
+
+validate_item = compile_schema(ITEM)
+validate_items = compile_bulk(validate_item)
+validate_import = compile_bulk(validate_item, max_items=MAX_IMPORT)
+validate_register = compile_schema(REGISTER)
+validate_login = compile_schema(LOGIN)
+validate_grants = compile_bulk(compile_schema(GRANT), max_items=100)
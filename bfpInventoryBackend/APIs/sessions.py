@@ -0,0 +1,58 @@
+# sessions.py
+# One row per logged-in device. Refresh tokens are never stored, only their
+# SHA-256, so validating a refresh is a single indexed lookup and a leaked
+# users.db does not leak usable tokens.
+import hashlib
+import time
+
+PURGE_BATCH = 500
+
+def init_sessions_table(cur):
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY,
+        token_hash TEXT UNIQUE NOT NULL,
+        user_id TEXT NOT NULL,
+        device TEXT,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+      )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)")
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def create(cur, user_id, token, device, expires_at):
+    cur.execute(
+      "INSERT INTO sessions (token_hash, user_id, device, created_at, expires_at) VALUES (?,?,?,?,?)",
+      (hash_token(token), user_id, device, time.time(), expires_at)
+    )
+
+def validate(cur, token):
+    """Returns the user_id of a live session for this refresh token, else None."""
+    cur.execute(
+      "SELECT user_id FROM sessions WHERE token_hash=? AND expires_at>?",
+      (hash_token(token), time.time())
+    )
+    row = cur.fetchone()
+    return row["user_id"] if row else None
+
+def revoke(cur, token):
+    cur.execute("DELETE FROM sessions WHERE token_hash=?", (hash_token(token),))
+    return cur.rowcount
+
+def purge_expired(conn, batch_size=PURGE_BATCH):
+    """Deletes expired sessions a batch at a time. Returns the number removed."""
+    removed = 0
+    while True:
+        n = conn.execute("""
+          DELETE FROM sessions WHERE id IN (
+            SELECT id FROM sessions WHERE expires_at<? LIMIT ?
+          )
+        """, (time.time(), batch_size)).rowcount
+        conn.commit()
+        removed += n
+        if n < batch_size:
+            return removed
@@ -0,0 +1,143 @@
+# snapshot.py
+# Online snapshots of bfp_inventory.db using SQLite's backup API, so a copy
+# can be taken while the app keeps writing. Pages are copied in small steps
+# with a pause in between into an in-memory copy, which is gzipped straight
+# to disk (no uncompressed file), then old snapshots are pruned. Every write
+# to the source restarts a stepped backup, so after a few restarts the copy
+# is taken in one step instead.
+#   python snapshot.py take
+#   python snapshot.py list
+#   python snapshot.py restore snapshots/bfp_inventory-20250101-020000.db.gz
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime as dt
+
+import lookups
+
+DB_PATH = "bfp_inventory.db"
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_KEEP = int(os.environ.get("SNAPSHOT_KEEP", 7))
+PAGES_PER_STEP = 256
+STEP_PAUSE = 0.01   # seconds between steps, lets writers get the lock
+MAX_RESTARTS = 3
+CHUNK = 1024 * 1024
+
+class _Restarted(Exception):
+    pass
+
+def _backup(src_path, dst, progress=None):
+    """Copies src_path into the open connection dst."""
+    last = [None, 0]   # remaining pages at the previous step, restarts so far
+    def step(status, remaining, total):
+        if last[0] is not None and remaining > last[0]:
+            last[1] += 1
+            if last[1] > MAX_RESTARTS:
+                raise _Restarted()
+        last[0] = remaining
+        if progress:
+            progress((total - remaining) / (total or 1))
+        time.sleep(STEP_PAUSE)
+    src = sqlite3.connect(src_path)
+    try:
+        try:
+            src.backup(dst, pages=PAGES_PER_STEP, progress=step)
+        except _Restarted:
+            # writes keep coming: hold the read lock once for the whole copy
+            src.backup(dst, pages=-1)
+    finally:
+        src.close()
+
+def _data_version(conn):
+    try:
+        return conn.execute("SELECT version FROM inventory_version WHERE id=1").fetchone()[0]
+    except (sqlite3.OperationalError, TypeError):
+        return None
+
+def list_snapshots(dest_dir=SNAPSHOT_DIR):
+    """Snapshot files, newest first."""
+    if not os.path.isdir(dest_dir):
+        return []
+    names = [n for n in os.listdir(dest_dir) if n.endswith(".db.gz")]
+    return [os.path.join(dest_dir, n) for n in sorted(names, reverse=True)]
+
+def take_snapshot(db_path=DB_PATH, dest_dir=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP, progress=None):
+    """Writes a gzipped snapshot, keeps the newest `keep` and returns its path."""
+    os.makedirs(dest_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(db_path))[0]
+    final = os.path.join(dest_dir, f"{base}-{dt.now():%Y%m%d-%H%M%S}.db.gz")
+    partial = final + ".partial"
+    copy = sqlite3.connect(":memory:")
+    try:
+        _backup(db_path, copy, progress)
+        data = memoryview(copy.serialize())
+        copy.close()
+        with gzip.open(partial, "wb") as dst:
+            for i in range(0, len(data), CHUNK):
+                dst.write(data[i:i + CHUNK])
+        os.replace(partial, final)
+    finally:
+        copy.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+    for old in list_snapshots(dest_dir)[keep:]:
+        os.remove(old)
+    return final
+
+def restore_snapshot(snapshot_path, db_path=DB_PATH):
+    """
+    Replaces the contents of db_path with the snapshot. The copy goes through
+    the backup API, so connections that stay open see a consistent database,
+    and both the data version and the lookup generation move forward so
+    running workers drop what they cached from before the restore.
+    """
+    raw = db_path + ".restore"
+    try:
+        with gzip.open(snapshot_path, "rb") as src, open(raw, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK)
+        check = sqlite3.connect(raw)
+        ok = check.execute("PRAGMA integrity_check").fetchone()[0]
+        check.close()
+        if ok != "ok":
+            raise RuntimeError(f"snapshot failed integrity check: {ok}")
+        live = sqlite3.connect(db_path)
+        try:
+            version = _data_version(live)
+            generation = lookups.generation(live.cursor()) or 0
+            _backup(raw, live)
+            if version is not None:
+                # past anything cached from before the restore, or web workers
+                # could serve pre-restore /items bytes
+                restored = _data_version(live) or 0
+                live.execute("UPDATE inventory_version SET version=? WHERE id=1", (max(version, restored) + 1,))
+            # the snapshot may reuse lookup ids workers hold for other values
+            lookups.init_lookup_table(live.cursor())
+            restored = lookups.generation(live.cursor())
+            live.execute("UPDATE lookup_generation SET generation=? WHERE id=1", (max(generation, restored) + 1,))
+            live.commit()
+        finally:
+            live.close()
+    finally:
+        if os.path.exists(raw):
+            os.remove(raw)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot or restore bfp_inventory.db.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("take")
+    sub.add_parser("list")
+    restore = sub.add_parser("restore")
+    restore.add_argument("snapshot")
+    args = parser.parse_args()
+
+    if args.cmd == "take":
+        print(f"✅ Snapshot written to {take_snapshot()}")
+    elif args.cmd == "list":
+        for path in list_snapshots():
+            print(path)
+    else:
+        restore_snapshot(args.snapshot)
+        print(f"✅ Restored {DB_PATH} from {args.snapshot}")
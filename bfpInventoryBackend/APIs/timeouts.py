@@ -0,0 +1,48 @@
+# timeouts.py
+# Bounds how long a request may spend inside SQLite. Connections opened while
+# handling a request get a progress handler that interrupts the running
+# statement once the route's budget is spent; the interrupt surfaces as
+# sqlite3.OperationalError("interrupted") and is turned into a 504.
+# Connections opened outside a request (worker.py, CLIs) are not limited.
+# Request connections are also closed at teardown, so one abandoned by an
+# interrupted handler cannot keep holding a write lock.
+import os
+import sqlite3
+import time
+
+from flask import g, has_request_context, request, jsonify
+
+STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 5000))
+# routes that legitimately scan a lot
+ROUTE_TIMEOUT_MS = {
+    "GET /items": 15000,
+    "GET /history": 15000,
+    "POST /reconcile": 120000,
+    "POST /items/bulk": 60000,
+}
+CHECK_EVERY = 10000   # SQLite VM instructions between deadline checks
+
+def route_timeout_ms():
+    if request.url_rule is None:
+        return STATEMENT_TIMEOUT_MS
+    return ROUTE_TIMEOUT_MS.get(f"{request.method} {request.url_rule.rule}", STATEMENT_TIMEOUT_MS)
+
+def limit(conn):
+    """Installs the current route's deadline on a SQLite connection."""
+    if has_request_context():
+        deadline = time.monotonic() + route_timeout_ms() / 1000
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, CHECK_EVERY)
+        g.setdefault("db_conns", []).append(conn)
+    return conn
+
+def init_app(app):
+    @app.errorhandler(sqlite3.OperationalError)
+    def interrupted(e):
+        if str(e) != "interrupted":
+            raise e
+        return jsonify(error="The database query took too long"),504
+
+    @app.teardown_request
+    def close_conns(exc):
+        for conn in g.pop("db_conns", ()):
+            conn.close()
@@ -0,0 +1,206 @@
+# worker.py
+# Runs queued jobs from the jobs table. Started as its own process type:
+#   worker: python worker.py
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+import traceback
+from datetime import datetime as dt, timedelta
+
+import access
+import archive
+import dedupe
+import idempotency
+import jobs
+import lookups
+import reconcile
+import schema
+import sessions
+import snapshot
+from backfill import backfill_specs
+
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 2))
+# a job still "running" after this long belonged to a worker that died
+STALE_AFTER_MINUTES = int(os.environ.get("JOB_STALE_AFTER_MINUTES", 60))
+# finished jobs (and their result files) are deleted after this many days
+JOB_RETENTION_DAYS = int(os.environ.get("JOB_RETENTION_DAYS", 7))
+BATCH_SIZE = 1000
+
+
+EXPORT_COLUMNS = (
+    "id", "office_name", "computer_device", "pc_name", "brand_model", "processor",
+    "motherboard", "ram", "graphics_processing", "internal_memory", "mac_address",
+    "operating_system", "microsoft_office", "antivirus_software", "status", "timestamp",
+)
+
+def get_conn():
+    conn = sqlite3.connect("bfp_inventory.db")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+# ─── HANDLERS ──────────────────────────────────────────────────────────────────
+# Each takes (conn, job, progress) and returns (bytes, content_type, filename).
+
+def run_export(conn, job, progress):
+    cur = conn.cursor()
+    total = cur.execute("SELECT COUNT(*) FROM inventory").fetchone()[0] or 1
+    cur.execute("""
+      SELECT i.*, o.office_name
+      FROM inventory i
+      LEFT JOIN offices o ON i.office_id=o.property
+    """)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    done = 0
+    while True:
+        rows = cur.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        decode_cur = conn.cursor()
+        writer.writerows(lookups.decode(decode_cur, dict(r)) for r in rows)
+        done += len(rows)
+        progress(done / total, f"{done} rows")
+    name = f"inventory-{dt.now():%Y%m%d-%H%M%S}.csv"
+    return out.getvalue().encode(), "text/csv", name
+
+def run_reconcile(conn, job, progress):
+    lines = io.StringIO((job["input"] or b"").decode("utf-8-sig"), newline="")
+    report = reconcile.reconcile(conn.cursor(), lines)
+    return json.dumps(report).encode(), "application/json", "reconcile-report.json"
+
+def run_archive(conn, job, progress):
+    days = int(job["params"].get("days", archive.ARCHIVE_AFTER_DAYS))
+    moved = archive.archive_retired(conn, older_than_days=days)
+    return json.dumps({"archived": moved}).encode(), "application/json", "archive.json"
+
+def run_backfill_specs(conn, job, progress):
+    n = backfill_specs(conn.cursor())
+    conn.commit()
+    return json.dumps({"updated": n}).encode(), "application/json", "backfill.json"
+
+def run_snapshot(conn, job, progress):
+    # no progress updates: they are writes to the database being copied, and
+    # each one would restart the stepped backup
+    path = snapshot.take_snapshot()
+    return json.dumps({"snapshot": os.path.basename(path)}).encode(), "application/json", "snapshot.json"
+
+class ImportRejected(Exception):
+    pass
+
+def run_import(conn, job, progress):
+    # main creates the Flask app on import; only the import job needs it
+    from main import import_items
+    items, errors = schema.validate_import(json.loads(job["input"] or b"null"))
+    if errors:
+        raise ImportRejected(f"invalid items: {json.dumps(errors)}")
+    scope = access.Scope({"write": job["params"].get("write", [])})
+    denied = sorted({str(d["office_id"]) for d in items if not scope.can("write", d["office_id"])})
+    if denied:
+        raise ImportRejected(f"no write access to office {', '.join(denied)}")
+    ts = dt.now().strftime("%Y-%m-%d %H:%M:%S")
+    ids, errors = import_items(conn.cursor(), items, ts)
+    if errors:
+        raise ImportRejected(f"MAC address already registered: {json.dumps(errors)}")
+    conn.commit()
+    return json.dumps({"imported": len(ids), "ids": ids}).encode(), "application/json", "import.json"
+
+def run_duplicates(conn, job, progress):
+    threshold = float(job["params"].get("threshold", dedupe.THRESHOLD))
+    report = dedupe.report(conn.cursor(), threshold)
+    if report["skipped_blocks"]:
+        print(f"⚠️ duplicates: {len(report['skipped_blocks'])} blocks over {dedupe.MAX_BLOCK} items were not compared")
+    return json.dumps(report).encode(), "application/json", "duplicates.json"
+
+HANDLERS = {
+    "export": run_export,
+    "reconcile": run_reconcile,
+    "archive": run_archive,
+    "backfill_specs": run_backfill_specs,
+    "snapshot": run_snapshot,
+    "duplicates": run_duplicates,
+    "import": run_import,
+}
+
+# ─── LOOP ──────────────────────────────────────────────────────────────────────
+def run_one(conn):
+    """Claims and runs one job. Returns False when the queue was empty."""
+    job = jobs.claim(conn)
+    if not job:
+        return False
+    lookups.check_generation(conn)
+    # progress goes through its own connection so it commits independently
+    # of whatever transaction the handler has open
+    status_conn = get_conn()
+    try:
+        data, content_type, name = HANDLERS[job["kind"]](
+            conn, job, lambda p, msg=None: jobs.set_progress(status_conn, job["id"], p, msg)
+        )
+        jobs.finish(status_conn, job["id"], data, content_type, name)
+    except Exception as e:
+        conn.rollback()
+        traceback.print_exc()
+        jobs.fail(status_conn, job["id"], f"{type(e).__name__}: {e}")
+    finally:
+        status_conn.close()
+    return True
+
+# ─── MAINTENANCE ───────────────────────────────────────────────────────────────
+def purge_idempotency_keys():
+    conn = get_conn()
+    try:
+        idempotency.purge_expired(conn)
+    finally:
+        conn.close()
+
+def purge_jobs():
+    conn = get_conn()
+    try:
+        cutoff = (dt.now() - timedelta(days=JOB_RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        jobs.purge_finished(conn, cutoff)
+    finally:
+        conn.close()
+
+def purge_sessions():
+    conn = sqlite3.connect("users.db")
+    try:
+        sessions.purge_expired(conn)
+    finally:
+        conn.close()
+
+# housekeeping run between jobs: (every N seconds, task)
+MAINTENANCE = (
+    (300, purge_idempotency_keys),
+    (600, purge_sessions),
+    (3600, purge_jobs),
+)
+
+def run_maintenance(last_run):
+    now = time.monotonic()
+    for interval, task in MAINTENANCE:
+        if now - last_run.get(task, float("-inf")) >= interval:
+            try:
+                task()
+            except Exception:
+                traceback.print_exc()
+            last_run[task] = now
+
+def main():
+    conn = get_conn()
+    jobs.init_jobs_table(conn.cursor())
+    cutoff = (dt.now() - timedelta(minutes=STALE_AFTER_MINUTES)).strftime("%Y-%m-%d %H:%M:%S")
+    requeued = jobs.requeue_stale(conn, cutoff)
+    if requeued:
+        print(f"⚠️ requeued {requeued} stale jobs")
+    print("worker started")
+    last_run = {}
+    while True:
+        run_maintenance(last_run)
+        if not run_one(conn):
+            time.sleep(POLL_INTERVAL)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# access.py
+# Office-level access control without a database hit per request, the
+# Postgres side of APIs/access.py. At login (and refresh) the user's office
+# grants are read once from user_offices and written into the access token as
+#   "offices": {"read": [1, 4] | "*", "write": [4] | "*"}
+# Routes check the token signature locally and use those claims: listings
+# get an `office_id IN (...)` predicate, single items are checked after load.
+# A user_offices row with a NULL office_id grants every office. Users with no
+# rows at all get DEFAULT_OFFICE_SCOPE ("none", or "all"). Grants are managed
+# with (DATABASE_URL set)
+#   python access.py grant <username> [--office N] [--write]
+#   python access.py revoke <username> [--office N]
+#   python access.py list [<username>]
+# and take effect at the user's next login or token refresh.
+import argparse
+import functools
+import os
+
+import jwt
+from flask import current_app, g, request, jsonify
+
+ALL = "*"
+DEFAULT_OFFICE_SCOPE = os.getenv("DEFAULT_OFFICE_SCOPE", "none")
+
+def init_access_table(cur):
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS user_offices (
+        user_id UUID NOT NULL,
+        office_id INTEGER,
+        can_write BOOLEAN NOT NULL DEFAULT false
+      );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_user_offices_user ON user_offices(user_id);")
+
+def load_claims(cur, user_id):
+    """The "offices" claim for a user's access token."""
+    cur.execute("SELECT office_id, can_write FROM user_offices WHERE user_id=%s", (str(user_id),))
+    rows = cur.fetchall()
+    if not rows:
+        everything = DEFAULT_OFFICE_SCOPE == "all"
+        return {"read": ALL if everything else [], "write": ALL if everything else []}
+    def scope(grants):
+        ids = [r["office_id"] for r in grants]
+        return ALL if None in ids else sorted(set(ids))
+    return {"read": scope(rows), "write": scope([r for r in rows if r["can_write"]])}
+
+def grants(cur, user_id):
+    """The user's user_offices rows as [{"office_id": N|None, "can_write": bool}]."""
+    cur.execute(
+      "SELECT office_id, can_write FROM user_offices WHERE user_id=%s ORDER BY office_id", (str(user_id),)
+    )
+    return [{"office_id": r["office_id"], "can_write": r["can_write"]} for r in cur.fetchall()]
+
+def set_grants(cur, user_id, rows):
+    """Replaces the user's grants with rows of (office_id|None, can_write)."""
+    cur.execute("DELETE FROM user_offices WHERE user_id=%s", (str(user_id),))
+    for office_id, can_write in rows:
+        cur.execute(
+          "INSERT INTO user_offices (user_id, office_id, can_write) VALUES (%s,%s,%s)",
+          (str(user_id), office_id, bool(can_write))
+        )
+
+class Scope:
+    def __init__(self, claims):
+        self.read = claims.get("read", [])
+        self.write = claims.get("write", [])
+
+    def _offices(self, mode):
+        return self.write if mode == "write" else self.read
+
+    def everywhere(self, mode="read"):
+        return self._offices(mode) == ALL
+
+    def can(self, mode, office_id):
+        offices = self._offices(mode)
+        if offices == ALL:
+            return True
+        try:
+            return int(office_id) in offices
+        except (TypeError, ValueError):
+            return False
+
+    def predicate(self, column, mode="read"):
+        """(sql, params) restricting column to the allowed offices; ("", []) when unrestricted."""
+        offices = self._offices(mode)
+        if offices == ALL:
+            return "", []
+        if not offices:
+            return "false", []
+        return f"{column} = ANY(%s)", [list(offices)]
+
+def _bearer():
+    header = request.headers.get("Authorization", "")
+    return header[7:] if header.startswith("Bearer ") else None
+
+def requires(mode="read", everywhere=False):
+    """
+    Rejects the request unless it carries a valid access token. With
+    everywhere set, the token must also grant `mode` on every office.
+    The caller's Scope is left in g.scope.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            token = _bearer()
+            if not token:
+                return jsonify(error="Authorization required"), 401
+            try:
+                payload = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
+            except jwt.ExpiredSignatureError:
+                return jsonify(error="Access token expired"), 401
+            except jwt.InvalidTokenError:
+                return jsonify(error="Invalid access token"), 401
+            if payload.get("typ") != "access":
+                return jsonify(error="Invalid access token"), 401
+            g.user_id = payload["user_id"]
+            g.scope = Scope(payload.get("offices", {}))
+            if everywhere and not g.scope.everywhere(mode):
+                return forbidden()
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def forbidden():
+    return jsonify(error="You do not have access to this office"), 403
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage office grants in Postgres.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    grant = sub.add_parser("grant", help="grant one office, or every office without --office")
+    grant.add_argument("username")
+    grant.add_argument("--office", type=int)
+    grant.add_argument("--write", action="store_true", help="allow writes, not only reads")
+    revoke = sub.add_parser("revoke", help="revoke one office, or every grant without --office")
+    revoke.add_argument("username")
+    revoke.add_argument("--office", type=int)
+    listing = sub.add_parser("list")
+    listing.add_argument("username", nargs="?")
+    args = parser.parse_args()
+
+    from main import connect_primary
+    conn = connect_primary()
+    with conn, conn.cursor() as cur:
+        if args.command == "list":
+            cur.execute(
+              "SELECT user_id, username FROM users" + (" WHERE username=%s" if args.username else ""),
+              (args.username,) if args.username else ()
+            )
+            for user in cur.fetchall():
+                shown = [("all" if g["office_id"] is None else g["office_id"], "rw" if g["can_write"] else "r")
+                         for g in grants(cur, user["user_id"])]
+                print(user["username"], " ".join(f"{o}:{m}" for o, m in shown) or f"(default: {DEFAULT_OFFICE_SCOPE})")
+        else:
+            cur.execute("SELECT user_id FROM users WHERE username=%s", (args.username,))
+            user = cur.fetchone()
+            if not user:
+                raise SystemExit(f"⚠️ No user named {args.username}")
+            rows = [(g["office_id"], g["can_write"]) for g in grants(cur, user["user_id"])]
+            if args.command == "grant":
+                rows = [r for r in rows if r[0] != args.office] + [(args.office, args.write)]
+            elif args.office is None:
+                rows = []
+            else:
+                rows = [r for r in rows if r[0] != args.office]
+            set_grants(cur, user["user_id"], rows)
+            print(f"✅ {args.username}: {len(rows)} grants (applies at next login or refresh)")
+    conn.close()
@@ -0,0 +1,110 @@
+# drain.py
+# Replays the local outbox (see outbox.py) to Postgres, oldest first. The
+# outbox is a file on the web host, so the web process drains it itself: each
+# gunicorn worker starts a Drainer thread, and a lock file next to the outbox
+# lets only one of them drain at a time, keeping ops in order. When that
+# worker is recycled its lock is released and another one takes over.
+# By hand, on the same host (waits for the lock like the workers do):
+#   python drain.py            # keep draining
+#   python drain.py --once     # drain what is queued now and exit
+import argparse
+import fcntl
+import os
+import threading
+import time
+
+import psycopg2
+
+import outbox
+
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 1))
+RETRY_INTERVAL = float(os.getenv("OUTBOX_RETRY_INTERVAL", 15))
+
+def drain_once(box, connect, apply_op):
+    """
+    Applies pending ops in order, one transaction each. Stops at the first
+    connection problem so later ops never overtake an earlier one.
+    Returns (applied, conflicts).
+    """
+    applied = conflicts = 0
+    ops = outbox.pending(box)
+    if not ops:
+        return applied, conflicts
+    conn = connect()
+    try:
+        for op in ops:
+            try:
+                with conn:
+                    reason = apply_op(conn, op)
+            except psycopg2.OperationalError:
+                raise
+            except psycopg2.Error as e:
+                reason = str(e).strip()
+            if reason:
+                outbox.mark_conflict(box, op["seq"], reason)
+                conflicts += 1
+            else:
+                outbox.mark_done(box, op["seq"])
+                applied += 1
+    finally:
+        conn.close()
+    return applied, conflicts
+
+def drain(box, connect, apply_op, once=False):
+    while True:
+        try:
+            applied, conflicts = drain_once(box, connect, apply_op)
+        except psycopg2.OperationalError as e:
+            print(f"⚠️ Postgres unavailable, retrying in {RETRY_INTERVAL:g}s: {e}")
+            time.sleep(RETRY_INTERVAL)
+            continue
+        if applied or conflicts:
+            s = outbox.status(box)
+            print(f"✅ applied {applied}, conflicts {conflicts}; {s['pending']} pending, lag {s['lag_seconds']}s")
+        elif once:
+            return
+        else:
+            time.sleep(POLL_INTERVAL)
+
+def hold_lock():
+    """Blocks until this process is the only drainer; returns the open lock file."""
+    lock = open(outbox.OUTBOX_PATH + ".drain-lock", "a")
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock
+        except BlockingIOError:
+            time.sleep(RETRY_INTERVAL)
+
+class Drainer:
+    def __init__(self, connect, apply_op):
+        self.connect = connect
+        self.apply_op = apply_op
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _run(self):
+        lock = hold_lock()
+        try:
+            drain(outbox.connect(), self.connect, self.apply_op)
+        finally:
+            lock.close()
+
+    def ensure_started(self):
+        # threads do not survive gunicorn's fork, so each worker starts its own
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, daemon=True, name="outbox-drain").start()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the local outbox to Postgres.")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    args = parser.parse_args()
+    if not outbox.enabled():
+        raise SystemExit("OUTBOX_PATH is not set")
+
+    from main import get_db_connection, apply_outbox_op
+    lock = hold_lock()
+    drain(outbox.connect(), get_db_connection, apply_outbox_op, once=args.once)
@@ -0,0 +1,52 @@
+# gunicorn.conf.py
+# Server settings for `gunicorn main:app` run from Service/ (gunicorn reads
+# this file from the working directory on its own). Everything can be
+# overridden from the env:
+#   WEB_CONCURRENCY        worker processes (default: one per core, at least 2)
+#   WEB_THREADS            threads per worker for gthread (default 4)
+#   GUNICORN_WORKER_CLASS  gthread (default), gevent, or sync
+#   GEVENT_CONNECTIONS     concurrent requests per gevent worker (default 100)
+#   GUNICORN_MAX_REQUESTS  recycle a worker after this many requests (default 1000)
+#
+# Reloads work as in APIs/gunicorn.conf.py: HUP for new settings,
+# USR2 + WINCH + QUIT for new code without dropping a request.
+import os
+
+def _cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", max(2, _cores())))
+threads = int(os.environ.get("WEB_THREADS", 4))
+# gevent: requests mostly wait on Postgres, so one process can hold many
+worker_connections = int(os.environ.get("GEVENT_CONNECTIONS", 100))
+
+# load main.py once in the master so the schema migrations run once. Not
+# under gevent: modules imported before the worker monkey-patches would
+# keep unpatched locks and sockets.
+preload_app = worker_class != "gevent"
+
+# recycle workers to cap memory creep; jitter keeps them from all restarting at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+# above the longest per-route statement budget (ROUTE_STATEMENT_TIMEOUT_MS)
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        # lets Postgres waits yield to other greenlets
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    if preload_app:
+        # start the readiness probes now; without preload, importing main
+        # here would come before gevent's patching, so the first request does
+        import main
+        main.prober.ensure_started()
@@ -0,0 +1,92 @@
+# outbox.py
+# Optional local write-ahead queue for item mutations. When OUTBOX_PATH is
+# set, POST/PUT/DELETE /items only append to a SQLite file next to the app
+# and answer 202 straight away; drain.py replays the queue to Postgres in
+# order. An op that would overwrite a newer row (by inventory.timestamp), or
+# that Postgres rejects, is parked as a conflict instead of blocking the rest.
+import json
+import os
+import sqlite3
+import time
+
+OUTBOX_PATH = os.getenv("OUTBOX_PATH")
+
+def enabled():
+    return bool(OUTBOX_PATH)
+
+def connect():
+    conn = sqlite3.connect(OUTBOX_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_outbox():
+    conn = connect()
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+      CREATE TABLE IF NOT EXISTS outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        payload TEXT,
+        ts TEXT NOT NULL,
+        queued_at REAL NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        error TEXT,
+        write_scope TEXT
+      )
+    """)
+    cols = {r["name"] for r in conn.execute("PRAGMA table_info(outbox)")}
+    if "write_scope" not in cols:
+        conn.execute("ALTER TABLE outbox ADD COLUMN write_scope TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, seq)")
+    conn.commit()
+    conn.close()
+
+def enqueue(op, item_id, payload, ts, write_scope):
+    """
+    Appends a mutation; ts is the timestamp the write will give the row.
+    write_scope is the caller's "write" office claim: the office the item is
+    in when the op is replayed is checked against it then.
+    """
+    conn = connect()
+    try:
+        seq = conn.execute(
+          "INSERT INTO outbox (op, item_id, payload, ts, queued_at, write_scope) VALUES (?,?,?,?,?,?)",
+          (op, item_id, json.dumps(payload), ts.isoformat(), time.time(), json.dumps(write_scope))
+        ).lastrowid
+        conn.commit()
+        return seq
+    finally:
+        conn.close()
+
+def pending(conn, limit=100):
+    rows = conn.execute(
+      "SELECT * FROM outbox WHERE status='pending' ORDER BY seq LIMIT ?", (limit,)
+    ).fetchall()
+    # ops queued before write_scope existed were not office-checked either
+    return [
+        dict(r, payload=json.loads(r["payload"] or "null"), write_scope=json.loads(r["write_scope"] or '"*"'))
+        for r in rows
+    ]
+
+def mark_done(conn, seq):
+    conn.execute("DELETE FROM outbox WHERE seq=?", (seq,))
+    conn.commit()
+
+def mark_conflict(conn, seq, error):
+    conn.execute("UPDATE outbox SET status='conflict', error=? WHERE seq=?", (error, seq))
+    conn.commit()
+
+def status(conn):
+    """Replication lag (pending ops and age of the oldest) plus parked conflicts."""
+    row = conn.execute(
+      "SELECT COUNT(*) AS n, MIN(queued_at) AS oldest FROM outbox WHERE status='pending'"
+    ).fetchone()
+    conflicts = conn.execute(
+      "SELECT seq, op, item_id, ts, error FROM outbox WHERE status='conflict' ORDER BY seq"
+    ).fetchall()
+    return {
+      "pending": row["n"],
+      "lag_seconds": round(time.time() - row["oldest"], 1) if row["oldest"] else 0,
+      "conflicts": [dict(r) for r in conflicts],
+    }
@@ -0,0 +1,102 @@
+# replicas.py
+# Routes read-only queries to Postgres read replicas and everything else to
+# the primary. A replica that is down or lagging more than max_lag seconds is
+# skipped until its next health check; with no healthy replica, reads simply
+# go to the primary. Lag is checked by a background thread every
+# check_interval seconds, so a down replica never costs a request a connect
+# timeout; a result older than a few intervals (a check stuck on a hung
+# replica) counts as unhealthy.
+#
+# Connections are made through zero-argument factories, so the router can be
+# exercised with two local databases (or sqlite3 stand-ins and a fake
+# lag_probe) without any real replication set up.
+import itertools
+import os
+import threading
+import time
+
+REPLICA_LAG_SQL = """
+  SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+  END AS lag
+"""
+STALE_INTERVALS = 3
+
+def pg_replica_lag(conn):
+    """Seconds the replica is behind its primary (0 when caught up)."""
+    with conn.cursor() as cur:
+        cur.execute(REPLICA_LAG_SQL)
+        row = cur.fetchone()
+    lag = row["lag"] if isinstance(row, dict) else row[0]
+    return float(lag or 0)
+
+class ReplicaRouter:
+    def __init__(self, primary, replicas=(), max_lag=5.0, check_interval=10.0,
+                 lag_probe=pg_replica_lag):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._next = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._state = {}   # replica index -> (healthy, checked_at)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def check_once(self):
+        for i, replica in enumerate(self.replicas):
+            try:
+                conn = replica()
+                try:
+                    healthy = self.lag_probe(conn) <= self.max_lag
+                finally:
+                    conn.close()
+            except Exception:
+                healthy = False
+            self._mark(i, healthy)
+
+    def _loop(self):
+        while True:
+            self.check_once()
+            time.sleep(self.check_interval)
+
+    def ensure_started(self):
+        # threads do not survive gunicorn's fork, so each worker starts its own
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._loop, daemon=True, name="replica-lag").start()
+
+    def _healthy(self, i):
+        self.ensure_started()
+        with self._lock:
+            # not checked yet: try it, a failed connect marks it down
+            healthy, checked_at = self._state.get(i, (True, None))
+        if checked_at is not None and time.monotonic() - checked_at > STALE_INTERVALS * self.check_interval:
+            return False
+        return healthy
+
+    def _mark(self, i, healthy):
+        with self._lock:
+            self._state[i] = (healthy, time.monotonic())
+
+    def connect(self, readonly=False):
+        """Returns a connection: a healthy replica for reads when one exists, else the primary."""
+        if readonly and self.replicas:
+            for _ in range(len(self.replicas)):
+                with self._lock:
+                    i = next(self._next)
+                if not self._healthy(i):
+                    continue
+                try:
+                    return self.replicas[i]()
+                except Exception:
+                    self._mark(i, False)
+        return self.primary()
+
+    def status(self):
+        """Health as last observed, for monitoring."""
+        with self._lock:
+            return {i: healthy for i, (healthy, _) in self._state.items()}
@@ -0,0 +1,338 @@
+# generate.py
+# Synthetic inventory and users at a scale the seed scripts never reach
+# (100k+ devices, 10k users), for reproducing slow paths locally. Values are
+# skewed the way real entries are: a few big offices hold most devices, the
+# same handful of OS/Office/antivirus strings repeat (with the odd spelling
+# variant), MACs come in every format the form accepts plus some junk, and
+# about one entry in a hundred is the same machine entered twice with a
+# mistyped MAC. A few devices are retired (condemned, disposed, ...) and old
+# enough for archive.py to move.
+# Run it from the app directory so its own main.py creates the schema:
+#   cd APIs && python ../Setup/generate.py --items 100000 --users 10000
+#   cd Service && DATABASE_URL=... python ../Setup/generate.py --target postgres
+import argparse
+import csv
+import io
+import itertools
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime as dt, timedelta
+
+import bcrypt
+
+from setup import OFFICES
+
+BATCH_SIZE = 10000
+PASSWORD = "password"
+OFFICE_SKEW = 1.1          # office of rank r gets weight 1 / r ** OFFICE_SKEW
+HISTORY_DAYS = 3 * 365
+RETIRED_RATE = 0.03
+# same default as APIs/archive.py; retired items are dated before it
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 365))
+
+class Pick:
+    """Weighted choice over (value, weight) pairs."""
+    def __init__(self, pairs):
+        self.values = [v for v, _ in pairs]
+        self.cum = list(itertools.accumulate(w for _, w in pairs))
+
+    def __call__(self, rng):
+        return rng.choices(self.values, cum_weights=self.cum)[0]
+
+DEVICES = Pick([("Desktop", 65), ("Laptop", 30), ("All-in-One", 5)])
+MODELS = {
+    "Desktop": Pick([
+        ("Dell OptiPlex 3080", 30), ("HP ProDesk 400 G7", 25), ("Lenovo ThinkCentre M70s", 15),
+        ("Acer Veriton M4660G", 12), ("Dell OptiPlex 7010", 8), ("Custom Build", 10),
+    ]),
+    "Laptop": Pick([
+        ("Lenovo ThinkPad E14", 30), ("HP ProBook 440 G8", 25), ("Dell Latitude 3420", 20),
+        ("Acer Aspire 5", 15), ("ASUS VivoBook 15", 10),
+    ]),
+    "All-in-One": Pick([("HP ProOne 400 G6", 60), ("Lenovo IdeaCentre AIO 3", 40)]),
+}
+PROCESSORS = {
+    "Desktop": Pick([
+        ("Intel Core i5-10500", 35), ("Intel Core i3-10100", 25), ("Intel Core i7-10700", 15),
+        ("AMD Ryzen 5 5600G", 15), ("Intel Core i5-3470", 10),
+    ]),
+    "Laptop": Pick([
+        ("Intel Core i5-1135G7", 40), ("Intel Core i3-1115G4", 25), ("Intel Core i7-1165G7", 15),
+        ("AMD Ryzen 5 5500U", 20),
+    ]),
+    "All-in-One": Pick([("Intel Core i5-10500T", 70), ("Intel Core i3-10100T", 30)]),
+}
+MOTHERBOARDS = Pick([
+    ("Intel H410", 30), ("Intel B460", 20), ("AMD A520", 12), ("Intel H61", 8), ("OEM", 25), (None, 5),
+])
+RAM = Pick([("4", 10), ("8", 45), ("16", 30), ("32", 6), ("8GB", 5), ("16 GB", 4)])
+STORAGE = Pick([
+    ("256 GB SSD", 25), ("512 GB SSD", 25), ("1 TB HDD", 20), ("256GB SSD + 1TB HDD", 10),
+    ("500 GB HDD", 10), ("512GB NVMe", 7), ("1 TB", 3),
+])
+GRAPHICS = Pick([
+    ("Intel UHD Graphics 630", 40), ("Intel Iris Xe", 20), ("AMD Radeon Vega 7", 12),
+    ("NVIDIA GeForce GT 1030", 8), ("Integrated", 15), (None, 5),
+])
+OPERATING_SYSTEMS = Pick([
+    ("Windows 10 Pro", 50), ("Windows 11 Pro", 30), ("Windows 10 Home", 6),
+    ("Windows 7 Professional", 4), ("Ubuntu 22.04 LTS", 3), ("macOS", 2),
+    ("windows 10 pro", 3), ("Win10 Pro", 2),
+])
+OFFICE_SUITES = Pick([
+    ("Microsoft Office 2019", 30), ("Microsoft 365", 25), ("Microsoft Office 2016", 20),
+    ("Microsoft Office 2013", 5), ("WPS Office", 8), ("LibreOffice", 4), (None, 8),
+])
+ANTIVIRUS = Pick([
+    ("Windows Defender", 40), ("ESET Endpoint Security", 25), ("Kaspersky Endpoint Security", 15),
+    ("Avast Free Antivirus", 10), ("McAfee", 3), (None, 7),
+])
+STATUSES = Pick([
+    ("Good condition", 78), ("For maintenance", 10), ("For upgrade", 7), ("For replacement", 5),
+])
+RETIRED_STATUSES = Pick([("Condemned", 50), ("Disposed", 30), ("Unserviceable", 20)])
+OUIS = Pick([(0x3C5282, 30), (0x001A4B, 20), (0x98E743, 20), (0xF8B46A, 15), (0x00E04C, 15)])
+MAC_FORMATS = Pick([
+    ("colon", 55), ("colon_lower", 10), ("dash", 15), ("bare", 8), ("cisco", 4), ("blank", 5), ("junk", 3),
+])
+JUNK_MACS = ("N/A", "none", "192.168.1.1", "111")
+NAME_STYLES = Pick([("upper", 90), ("lower", 6), ("spaced", 4)])
+GRANTS = Pick([("admin", 3), ("office", 72), ("reader", 25)])
+
+def format_mac(rng, mac_int):
+    style = MAC_FORMATS(rng)
+    if style == "blank":
+        return None
+    if style == "junk":
+        return rng.choice(JUNK_MACS)
+    raw = "%012x" % mac_int
+    if style == "bare":
+        return raw.upper()
+    if style == "cisco":
+        return ".".join(raw[i:i + 4] for i in range(0, 12, 4))
+    pairs = [raw[i:i + 2] for i in range(0, 12, 2)]
+    if style == "colon_lower":
+        return ":".join(pairs)
+    return ("-" if style == "dash" else ":").join(pairs).upper()
+
+def new_mac(rng, used):
+    while True:
+        mac = OUIS(rng) << 24 | rng.getrandbits(24)
+        if mac not in used:
+            used.add(mac)
+            return mac
+
+def mistype(rng, mac, used):
+    """The same MAC with one hex digit changed, still unused."""
+    while True:
+        shift = 4 * rng.randrange(6)     # the NIC half, where typos go unnoticed
+        typo = mac ^ (rng.randrange(1, 16) << shift)
+        if typo not in used:
+            used.add(typo)
+            return typo
+
+def pc_name(rng, office, n):
+    style = NAME_STYLES(rng)
+    if style == "spaced":
+        return f"BFP {office} {n}"
+    name = f"BFP-{office}-{n:03d}"
+    return name.lower() if style == "lower" else name
+
+def office_picker(rng, office_ids):
+    ranked = list(office_ids)
+    rng.shuffle(ranked)
+    return Pick([(o, 1 / (r + 1) ** OFFICE_SKEW) for r, o in enumerate(ranked)])
+
+def generate_items(rng, count, offices, used_macs, duplicate_rate):
+    """Yields (id, item payload, timestamp). offices maps office id -> name."""
+    pick_office = office_picker(rng, offices)
+    counters = {}
+    now = dt.now()
+    previous = None
+    for _ in range(count):
+        ts = (now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+        if previous and rng.random() < duplicate_rate:
+            # re-entered by someone else: name spelled differently, MAC mistyped
+            data = dict(previous[1])
+            data["pc_name"] = data["pc_name"].replace("-", " ").lower()
+            data["mac_address"] = format_mac(rng, mistype(rng, previous[2], used_macs))
+            yield str(uuid.uuid4()), data, ts
+            continue
+        office_id = pick_office(rng)
+        counters[office_id] = n = counters.get(office_id, 0) + 1
+        device = DEVICES(rng)
+        mac = new_mac(rng, used_macs)
+        data = {
+            "office_id": office_id,
+            "computer_device": device,
+            "pc_name": pc_name(rng, offices[office_id].replace("/", ""), n),
+            "brand_model": MODELS[device](rng),
+            "processor": PROCESSORS[device](rng),
+            "motherboard": MOTHERBOARDS(rng),
+            "ram": RAM(rng),
+            "graphics_processing": GRAPHICS(rng),
+            "internal_memory": STORAGE(rng),
+            "mac_address": format_mac(rng, mac),
+            "operating_system": OPERATING_SYSTEMS(rng),
+            "microsoft_office": OFFICE_SUITES(rng),
+            "antivirus_software": ANTIVIRUS(rng),
+            "status": STATUSES(rng),
+        }
+        if rng.random() < RETIRED_RATE:
+            data["status"] = RETIRED_STATUSES(rng)
+            age = rng.randrange((ARCHIVE_AFTER_DAYS + 1) * 86400, (ARCHIVE_AFTER_DAYS + 365) * 86400)
+            ts = (now - timedelta(seconds=age)).strftime("%Y-%m-%d %H:%M:%S")
+        previous = (None, data, mac)
+        yield str(uuid.uuid4()), data, ts
+
+def generate_users(rng, count, start, offices, rounds):
+    """Yields (user_id, username, email, password hash, grants); grants are (office_id|None, can_write)."""
+    pick_office = office_picker(rng, offices)
+    for i in range(start, start + count):
+        kind = GRANTS(rng)
+        if kind == "admin":
+            grants = [(None, 1)]
+        elif kind == "office":
+            grants = [(pick_office(rng), 1)]
+        else:
+            grants = [(o, 0) for o in {pick_office(rng) for _ in range(rng.randint(2, 3))}]
+        hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds))
+        yield str(uuid.uuid4()), f"user{i:05d}", f"user{i:05d}@bfp.example", hashed, grants
+
+def batches(iterable, size=BATCH_SIZE):
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+# ─── SQLITE (APIs) ─────────────────────────────────────────────────────────────
+def load_sqlite(app, args, rng):
+    import dedupe
+
+    conn = app.get_inventory_conn(); cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) AS n FROM offices")
+    if cur.fetchone()["n"] == 0:
+        cur.executemany("INSERT INTO offices (office_name) VALUES (?)", OFFICES)
+        conn.commit()
+    cur.execute("SELECT property, office_name FROM offices")
+    # inventory.office_id is TEXT in the SQLite schema
+    offices = {str(r["property"]): r["office_name"] for r in cur.fetchall()}
+    cur.execute("SELECT mac_int FROM inventory WHERE mac_int IS NOT NULL")
+    used = {r["mac_int"] for r in cur.fetchall()}
+
+    # set_timestamp_on_insert would stamp every row with "now"; lift it for
+    # the load, as init_inventory_db does with the update trigger
+    cur.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name='set_timestamp_on_insert'")
+    trigger = cur.fetchone()
+    cur.execute("DROP TRIGGER IF EXISTS set_timestamp_on_insert")
+    try:
+        for batch in batches(generate_items(rng, args.items, offices, used, args.duplicate_rate)):
+            cur.executemany(app.INSERT_ITEM_SQL, [app.item_params(cur, iid, data, ts) for iid, data, ts in batch])
+            conn.commit()
+            print(f"  {len(batch)} items")
+    finally:
+        if trigger:
+            cur.execute(trigger["sql"])
+            conn.commit()
+    # one pass instead of indexing row by row
+    dedupe.rebuild(cur)
+    conn.commit()
+    conn.close()
+
+    conn = app.get_user_conn(); cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) AS n FROM users")
+    start = cur.fetchone()["n"] + 1
+    for batch in batches(generate_users(rng, args.users, start, offices, args.bcrypt_rounds)):
+        cur.executemany(
+          "INSERT INTO users (user_id, username, email, password) VALUES (?,?,?,?)",
+          [(uid, name, email, hashed) for uid, name, email, hashed, _ in batch]
+        )
+        cur.executemany(
+          "INSERT INTO user_offices (user_id, office_id, can_write) VALUES (?,?,?)",
+          [(uid, office, write) for uid, _, _, _, grants in batch for office, write in grants]
+        )
+        conn.commit()
+        print(f"  {len(batch)} users")
+    conn.close()
+
+# ─── POSTGRES (Service) ────────────────────────────────────────────────────────
+PG_ITEM_COLUMNS = (
+    "id", "office_id", "computer_device", "pc_name", "brand_model", "processor", "motherboard",
+    "ram", "graphics_processing", "internal_memory", "mac_address", "operating_system",
+    "microsoft_office", "antivirus_software", "status", "timestamp", "mac_int",
+    "ram_mb", "storage_gb", "storage_type",
+)
+
+def load_postgres(app, args, rng):
+    from psycopg2.extras import execute_values
+
+    conn = app.connect_primary()
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) AS n FROM offices")
+        if cur.fetchone()["n"] == 0:
+            execute_values(cur, "INSERT INTO offices (office_name) VALUES %s", OFFICES)
+        cur.execute("SELECT property, office_name FROM offices")
+        offices = {r["property"]: r["office_name"] for r in cur.fetchall()}
+        if app.is_partitioned(cur):
+            for office_id in offices:
+                app.ensure_office_partition(cur, office_id)
+        cur.execute("SELECT mac_int FROM inventory WHERE mac_int IS NOT NULL")
+        used = {r["mac_int"] for r in cur.fetchall()}
+
+    copy_sql = f"COPY inventory ({', '.join(PG_ITEM_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    for batch in batches(generate_items(rng, args.items, offices, used, args.duplicate_rate)):
+        buf = io.StringIO()
+        out = csv.writer(buf)
+        for iid, data, ts in batch:
+            out.writerow([
+                iid, *(data[c] for c in PG_ITEM_COLUMNS[1:15]), ts,
+                app.normalize_mac(data["mac_address"]), *app.parse_specs(data),
+            ])
+        buf.seek(0)
+        with conn, conn.cursor() as cur:
+            cur.copy_expert(copy_sql, buf)
+        print(f"  {len(batch)} items")
+
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MAX(id), 0) AS n FROM users")
+        start = cur.fetchone()["n"] + 1
+    for batch in batches(generate_users(rng, args.users, start, offices, args.bcrypt_rounds)):
+        with conn, conn.cursor() as cur:
+            execute_values(
+              cur, "INSERT INTO users (user_id, username, email, password) VALUES %s",
+              [(uid, name, email, hashed) for uid, name, email, hashed, _ in batch]
+            )
+            execute_values(
+              cur, "INSERT INTO user_offices (user_id, office_id, can_write) VALUES %s",
+              [(uid, office, bool(write)) for uid, _, _, _, grants in batch for office, write in grants]
+            )
+        print(f"  {len(batch)} users")
+    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load synthetic inventory items and users.")
+    parser.add_argument("--target", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.01,
+                        help="share of items that re-enter the previous machine with a mistyped MAC")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4,
+                        help="bcrypt cost for the generated password hashes (the app uses 12)")
+    parser.add_argument("--seed", type=int, help="fix the random seed for a repeatable data set")
+    args = parser.parse_args()
+
+    # the app's own module creates and migrates the schema on import
+    sys.path.insert(0, os.getcwd())
+    import main as app
+
+    start = time.monotonic()
+    rng = random.Random(args.seed)
+    load = load_sqlite if args.target == "sqlite" else load_postgres
+    load(app, args, rng)
+    print(f"✅ {args.items} items and {args.users} users loaded into {args.target} "
+          f"in {time.monotonic() - start:.1f}s (password for every user: {PASSWORD!r})")
@@ -1,5 +1,31 @@
 import sqlite3
 
+OFFICES = [
+    ("SAO",),
+    ("FSED",),
+    ("FINANCE",),
+    ("CRS",),
+    ("HSU",),
+    ("ACCOUNTING",),
+    ("BUDGET",),
+    ("ADMIN",),
+    ("PLANS",),
+    ("RD",),
+    ("ARDA",),
+    ("ARDO",),
+    ("RCS",),
+    ("ITCU/FCOS",),
+    ("ROD",),
+    ("CHAPLAIN",),
+    ("LEGAL",),
+    ("HEARING",),
+    ("RLD",),
+    ("GSS",),
+    ("PIU",),
+    ("IAS",),
+    ("IIS",),
+]
+
 def create_database():
     # Connect to (or create) the database file
     conn = sqlite3.connect("bfp_inventory.db")
@@ -23,9 +49,11 @@ def create_database():
             mac_address TEXT,
             operating_system TEXT,
             microsoft_office TEXT,
-            antivirus_software TEXT
+            antivirus_software TEXT,
+            mac_int INTEGER                       -- mac_address as a 48-bit integer
         )
     ''')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_inventory_mac_int ON inventory(mac_int)")
     
     # Create the 'offices' table with columns 'property' and 'office_name'
     # Here, 'property' is the auto-increment primary key.
@@ -39,32 +67,7 @@ def create_database():
     # Seed the 'offices' table with your provided list if it's empty.
     cursor.execute("SELECT COUNT(*) FROM offices")
     if cursor.fetchone()[0] == 0:
-        offices = [
-            ("SAO",),
-            ("FSED",),
-            ("FINANCE",),
-            ("CRS",),
-            ("HSU",),
-            ("ACCOUNTING",),
-            ("BUDGET",),
-            ("ADMIN",),
-            ("PLANS",),
-            ("RD",),
-            ("ARDA",),
-            ("ARDO",),
-            ("RCS",),
-            ("ITCU/FCOS",),
-            ("ROD",),
-            ("CHAPLAIN",),
-            ("LEGAL",),
-            ("HEARING",),
-            ("RLD",),
-            ("GSS",),
-            ("PIU",),
-            ("IAS",),
-            ("IIS",)
-        ]
-        cursor.executemany("INSERT INTO offices (office_name) VALUES (?)", offices)
+        cursor.executemany("INSERT INTO offices (office_name) VALUES (?)", OFFICES)
     
     conn.commit()
     conn.close()